@@ -0,0 +1,184 @@
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+
+from pantry import _EPOCH_ORDINAL
+
+# ==========================================
+# 📊 PANTRY ANALYTICS ROLLUPS
+# ==========================================
+# Totals for the Analytics tab, valued at catalog prices: total value,
+# healthy entry count, value per category, and value per category per
+# purchase day / week / month. They are adjusted when entries are added
+# or removed, and per item when the catalog changes an item's price,
+# category or health rating, so drawing the tab never walks the pantry.
+#
+# Per item and period the rollup keeps {period start: units}. A price
+# change then only revisits the periods that item was bought in.
+
+PERIODS = ("Daily", "Weekly", "Monthly")
+UNKNOWN = (0, "Unknown", False)
+
+
+def period_starts(days, period):
+    """Day ordinals of the day / week (Monday) / month each day falls in."""
+    days = np.asarray(days, dtype=np.int64)
+    if period == "Daily":
+        return days
+    if period == "Weekly":
+        # Ordinal 1 (0001-01-01) is a Monday
+        return days - (days - 1) % 7
+    months = (days - _EPOCH_ORDINAL).astype("datetime64[D]").astype("datetime64[M]")
+    return months.astype("datetime64[D]").astype(np.int64) + _EPOCH_ORDINAL
+
+
+def item_details(product):
+    """(price, category, healthy) of a catalog entry, or UNKNOWN."""
+    if not product:
+        return UNKNOWN
+    return (product.get('price', 0), product.get('category', "Unknown"),
+            bool(product.get('healthy', False)))
+
+
+class PantryAnalytics:
+    """Rollups over a PantryStore, kept up to date by the agent.
+
+    Call added()/removed() with the rows of every pantry change and
+    sync_catalog() before reading, which is a no-op unless the catalog
+    version moved.
+    """
+
+    def __init__(self, store, catalog, catalog_version=None):
+        self._store = store
+        self.total_value = 0
+        self.healthy_count = 0
+        self.total_items = 0
+        self._categories = {}  # category -> [units, value]
+        self._periods = {period: {} for period in PERIODS}  # (start, category) -> [units, value]
+        self._details = []     # item code -> (price, category, healthy) applied
+        self._units = []       # item code -> units in the pantry
+        self._buckets = {period: [] for period in PERIODS}  # item code -> Counter
+        self._catalog = catalog
+        self.catalog_version = catalog_version
+        self._change(store.item_codes, store.buy_days, +1)
+
+    # --- Pantry changes ---
+
+    def added(self, rows):
+        self._change_rows(rows, +1)
+
+    def removed(self, rows):
+        self._change_rows(rows, -1)
+
+    def _change_rows(self, rows, sign):
+        if rows:
+            codes = [self._store.item_code(row['item']) for row in rows]
+            days = [row['buy_date'].toordinal() for row in rows]
+            self._change(codes, days, sign)
+
+    def _change(self, codes, days, sign):
+        codes = np.asarray(codes, dtype=np.int64)
+        days = np.asarray(days, dtype=np.int64)
+        self._grow()
+        for code, n in zip(*np.unique(codes, return_counts=True)):
+            self._units[code] += sign * int(n)
+            self._value_item(code, sign * int(n))
+
+        for period in PERIODS:
+            cells, counts = np.unique(
+                np.stack([period_starts(days, period), codes]), axis=1,
+                return_counts=True)
+            for (start, code), n in zip(cells.T.tolist(), counts.tolist()):
+                buckets = self._buckets[period][code]
+                buckets[start] += sign * n
+                if not buckets[start]:
+                    del buckets[start]
+                self._value_cell(period, start, code, sign * n)
+
+    def _grow(self):
+        for code in range(len(self._details), len(self._store.item_names)):
+            self._details.append(item_details(
+                self._catalog.get(self._store.item_names[code])))
+            self._units.append(0)
+            for period in PERIODS:
+                self._buckets[period].append(Counter())
+
+    # --- Catalog changes ---
+
+    def sync_catalog(self, catalog, version):
+        """Revalues the items whose price, category or rating changed."""
+        if version == self.catalog_version and catalog is self._catalog:
+            return
+        self._catalog, self.catalog_version = catalog, version
+        self._grow()
+        for code, name in enumerate(self._store.item_names):
+            details = item_details(catalog.get(name))
+            if details == self._details[code]:
+                continue
+            # Take the item out at its old valuation, put it back at the new
+            self._revalue(code, -1)
+            self._details[code] = details
+            self._revalue(code, +1)
+
+    def _revalue(self, code, sign):
+        self._value_item(code, sign * self._units[code])
+        for period in PERIODS:
+            for start, n in self._buckets[period][code].items():
+                self._value_cell(period, start, code, sign * n)
+
+    # --- Valuation ---
+
+    def _value_item(self, code, n):
+        price, category, healthy = self._details[code]
+        self.total_items += n
+        self.total_value += price * n
+        if healthy:
+            self.healthy_count += n
+        _add_cell(self._categories, category, n, price * n)
+
+    def _value_cell(self, period, start, code, n):
+        price, category, _ = self._details[code]
+        _add_cell(self._periods[period], (start, category), n, price * n)
+
+    # --- Reads ---
+
+    @property
+    def spend_by_cat(self):
+        return {category: value for category, (_, value)
+                in sorted(self._categories.items())}
+
+    def trend(self, period):
+        """{period start: {category: value}}, oldest first."""
+        table = {}
+        for (start, category), (_, value) in sorted(self._periods[period].items()):
+            table.setdefault(datetime.fromordinal(start), {})[category] = value
+        return table
+
+    def check_consistency(self):
+        """Brute-force recount of the totals; returns the keys that differ
+        as {key: (maintained, actual)}, so an empty dict means consistent."""
+        store = self._store
+        fresh = PantryAnalytics(store, self._catalog, self.catalog_version)
+        maintained = {"total_value": self.total_value,
+                      "healthy_count": self.healthy_count,
+                      "total_items": self.total_items,
+                      "spend_by_cat": self.spend_by_cat}
+        maintained.update({period: self.trend(period) for period in PERIODS})
+        actual = {"total_value": fresh.total_value,
+                  "healthy_count": fresh.healthy_count,
+                  "total_items": len(store),
+                  "spend_by_cat": fresh.spend_by_cat}
+        actual.update({period: fresh.trend(period) for period in PERIODS})
+        return {key: (maintained[key], actual[key]) for key in actual
+                if maintained[key] != actual[key]}
+
+
+def _add_cell(cells, key, units, value):
+    cell = cells.get(key)
+    if cell is None:
+        cell = cells[key] = [0, 0]
+    cell[0] += units
+    cell[1] += value
+    if not cell[0]:
+        del cells[key]
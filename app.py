@@ -1,22 +1,67 @@
 import streamlit as st
-import pandas as pd
+import numpy as np
+import hmac
 import json
+import logging
 import re
 import time
-from datetime import datetime, timedelta
-import google.generativeai as genai
+from datetime import datetime
 import os
 
+from pantry import BUCKET_NAMES, PantryStore, StatusTimeline
+from cart import ShoppingCart
+from analytics import PERIODS, PantryAnalytics
+from restock import RestockEngine, category_prior, restock_messages
+from catalog import catalog_cache
+from chat import ChatHistory, ChatSession, chat_router
+from llm import (LazyModel, LLMGateway, StreamedReply, analyze_product_prompt, detail_parser,
+                 fingerprint, normalize_text, pantry_context, parse_json_response,
+                 response_cache)
+from storage import DataManager
+from metrics import registry as metrics
+
 # ==========================================
 # 🔑 CONFIGURATION
 # ==========================================
 # ⚠️ SECURITY NOTE: For a real app, use st.secrets.
 GEMINI_API_KEY = st.secrets.get("GEMINI_API_KEY", "")
 
+# Chat reply latency (time to first token, total) is logged by llm at INFO,
+# which Python drops unless the logger is configured
+llm_logger = logging.getLogger("llm")
+if not llm_logger.handlers:
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(name)s: %(message)s"))
+    llm_logger.addHandler(handler)
+    llm_logger.setLevel(logging.INFO)
+    llm_logger.propagate = False
+
+# Timing spans for this run (see metrics.py), on when the server is started
+# with GROCERY_METRICS=1. The panel shows every session's timings and can
+# reset them, so it also needs ?diagnostics=<DIAGNOSTICS_TOKEN from secrets>
+DIAGNOSTICS_TOKEN = st.secrets.get("DIAGNOSTICS_TOKEN", "")
+SHOW_DIAGNOSTICS = (metrics.enabled and bool(DIAGNOSTICS_TOKEN) and hmac.compare_digest(
+    st.query_params.get("diagnostics", ""), DIAGNOSTICS_TOKEN))
+metrics.start_run()
+
+
+def gemini_model(api_key):
+    # Imported on the first model call: the SDK alone takes ~1s to import
+    import google.generativeai as genai
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel('gemini-2.5-flash')
+
+
+@st.cache_resource
+def get_model(api_key):
+    """One gateway (worker threads, queue, metrics) shared by every session."""
+    return LLMGateway(LazyModel(lambda: gemini_model(api_key)))
+
+
 try:
-    genai.configure(api_key=GEMINI_API_KEY)
-    model = genai.GenerativeModel('gemini-2.5-flash')
+    model = get_model(GEMINI_API_KEY)
 except Exception as e:
+    model = None
     st.error(f"Error configuring Gemini: {e}")
 
 # ==========================================
@@ -52,80 +97,11 @@ def load_custom_styles():
 # ==========================================
 # 📂 PART 1: DATA MANAGER (READ & WRITE)
 # ==========================================
+# See storage.py for the pantry journal and catalog persistence.
 
-
-class DataManager:
-    HISTORY_FILE = "pantry_history.json"
-    CATALOG_FILE = "products.json"
-
-    @staticmethod
-    def load_catalog():
-        try:
-            with open(DataManager.CATALOG_FILE, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
-
-    @staticmethod
-    def save_catalog(catalog_data):
-        with open(DataManager.CATALOG_FILE, 'w') as f:
-            json.dump(catalog_data, f, indent=4)
-
-    @staticmethod
-    def load_history():
-        try:
-            with open(DataManager.HISTORY_FILE, 'r') as f:
-                raw_data = json.load(f)
-
-            processed_data = []
-            today = datetime.now()
-
-            for entry in raw_data:
-                if 'buy_date_offset' in entry:
-                    buy_date = today + timedelta(days=entry['buy_date_offset'])
-                    expiry_date = today + \
-                        timedelta(days=entry['expiry_offset'])
-                else:
-                    try:
-                        buy_date = datetime.strptime(
-                            entry['buy_date'], "%Y-%m-%d")
-                        expiry_date = datetime.strptime(
-                            entry['expiry_date'], "%Y-%m-%d")
-                    except TypeError:
-                        buy_date = entry['buy_date']
-                        expiry_date = entry['expiry_date']
-
-                processed_data.append({
-                    "item": entry['item'],
-                    "buy_date": buy_date,
-                    "expiry_date": expiry_date,
-                    "status": entry['status']
-                })
-            return processed_data
-        except FileNotFoundError:
-            return []
-
-    @staticmethod
-    def save_history(pantry_data):
-        serializable_data = []
-        for entry in pantry_data:
-            serializable_data.append({
-                "item": entry['item'],
-                "buy_date": entry['buy_date'].strftime("%Y-%m-%d"),
-                "expiry_date": entry['expiry_date'].strftime("%Y-%m-%d"),
-                "status": entry['status']
-            })
-
-        with open(DataManager.HISTORY_FILE, 'w') as f:
-            json.dump(serializable_data, f, indent=4)
-
-
-PRODUCT_CATALOG = DataManager.load_catalog()
-ALL_PRODUCTS = {}
-for cat, items in PRODUCT_CATALOG.items():
-    for name, details in items.items():
-        ALL_PRODUCTS[name] = details
-        ALL_PRODUCTS[name]['category'] = cat
+# Parsed and indexed once per catalog change, shared by all sessions
+with metrics.span("catalog_load"):
+    CATALOG = catalog_cache.get()
 
 # ==========================================
 # 🤖 PART 2: THE AGENT LOGIC
@@ -133,15 +109,26 @@ for cat, items in PRODUCT_CATALOG.items():
 
 
 class SmartAgent:
+    # Range of the "Fast Forward Time" slider
+    SLIDER_DAYS = 14
+    # Token budget for the pantry/cart context sent with chat messages
+    CONTEXT_TOKENS = 400
+
     def __init__(self):
         if 'pantry' not in st.session_state:
-            st.session_state.pantry = DataManager.load_history()
-        if 'shopping_list' not in st.session_state:
-            st.session_state.shopping_list = []
+            st.session_state.pantry = PantryStore(DataManager.load_history())
+            st.session_state.analytics = PantryAnalytics(
+                st.session_state.pantry, CATALOG, DataManager.catalog_version)
+            st.session_state.restock = RestockEngine(
+                st.session_state.pantry, category_prior(CATALOG))
+        if 'cart' not in st.session_state:
+            st.session_state.cart = ShoppingCart()
         if 'pending_suggestion' not in st.session_state:
             st.session_state.pending_suggestion = None
         if "chat_history" not in st.session_state:
-            st.session_state.chat_history = []
+            st.session_state.chat_history = ChatHistory()
+            st.session_state.chat_session = ChatSession()
+            st.session_state.chat_window = ChatHistory.PAGE
         if "add_flow_item" not in st.session_state:
             st.session_state.add_flow_item = None
 
@@ -149,69 +136,114 @@ class SmartAgent:
         return st.session_state.get('sim_date', datetime.now())
 
     def check_expiry_status(self):
-        current_date = self.get_simulation_date()
-        alerts = []
-        for entry in st.session_state.pantry:
-            days_left = (entry['expiry_date'] - current_date).days
-            if days_left < 0:
-                entry['status'] = "Expired"
-                alerts.append(f"❌ **{entry['item']}** has expired!")
-            elif days_left <= 2:
-                entry['status'] = "Critical"
-                alerts.append(
-                    f"⚠️ **{entry['item']}** expires in {days_left} days!")
-            elif days_left <= 5:
-                entry['status'] = "Expiring Soon"
-                alerts.append(
-                    f"⏳ **{entry['item']}** expires in {days_left} days.")
-            else:
-                entry['status'] = "Good"
-        return alerts
+        index = st.session_state.pantry.expiry
+        index.refresh(self.get_simulation_date())
+        status_changes = index.take_changes()
+        if status_changes:
+            DataManager.record_status(status_changes)
+        return index.alerts()
+
+    def get_timeline(self):
+        """Per-day alerts for the slider, rebuilt only when the pantry, the
+        catalog or the calendar day changes."""
+        pantry = st.session_state.pantry
+        key = (id(pantry), pantry.version, DataManager.catalog_version,
+               datetime.now().date())
+        if st.session_state.get('timeline_key') != key:
+            st.session_state.timeline = StatusTimeline(
+                pantry.expiry, datetime.now(),
+                self.SLIDER_DAYS, self.predict_needs)
+            st.session_state.timeline_key = key
+        return st.session_state.timeline
+
+    def get_alerts(self, days_offset):
+        timeline = self.get_timeline()
+        st.session_state['sim_date'] = timeline.date_at(days_offset)
+        self.check_expiry_status()
+        return timeline.alerts_at(days_offset)
 
     def check_pantry_stock(self, item_name):
-        count = 0
-        for entry in st.session_state.pantry:
-            if entry['item'] == item_name and entry['status'] in ['Good', 'Expiring Soon', 'Critical']:
-                count += 1
-        return count
-
-    def predict_needs(self):
-        suggestions = []
-        current_date = self.get_simulation_date()
-        suggested_items = set()
-
-        for entry in st.session_state.pantry:
-            if entry['item'] in suggested_items:
-                continue
-
-            days_since_buy = (current_date - entry['buy_date']).days
-            details = ALL_PRODUCTS.get(entry['item'])
-
-            if details:
-                cat = details['category']
-                msg = None
-
-                if cat == "Dairy & Chill" and days_since_buy >= 7:
-                    msg = f"🥛 It's been {days_since_buy} days since you bought **{entry['item']}**. Need more?"
-                elif cat == "Bakery & Snacks" and days_since_buy >= 4:
-                    msg = f"🍞 Your **{entry['item']}** might be finished by now. Restock?"
-                elif cat == "Rice & Grains" and days_since_buy >= 30:
-                    msg = f"🍚 It's been a month since you bought **{entry['item']}**. Checking stock?"
-                elif cat == "Produce" and days_since_buy >= 7:
-                    msg = f"🥦 Fresh veggies like **{entry['item']}** might need replacing."
-                elif cat == "Beverages" and days_since_buy >= 14:
-                    msg = f"🥤 Running low on **{entry['item']}**?"
-                elif cat == "Pantry Staples" and days_since_buy >= 60:
-                    msg = f"🧂 Check your **{entry['item']}** supply."
-
-                if msg:
-                    suggestions.append(msg)
-                    suggested_items.add(entry['item'])
-
-        return suggestions
+        return st.session_state.pantry.stock.in_stock(item_name)
+
+    def predict_needs(self, current_date=None):
+        if current_date is None:
+            current_date = self.get_simulation_date()
+        engine = st.session_state.restock
+        engine.sync_catalog(CATALOG, DataManager.catalog_version)
+        return restock_messages(engine.due(current_date), CATALOG)
+
+    def pantry_analytics(self):
+        """Maintained totals and spend rollups, revalued if the catalog
+        changed since they were last read."""
+        analytics = st.session_state.analytics
+        analytics.sync_catalog(CATALOG, DataManager.catalog_version)
+        return analytics
+
+    def add_to_pantry(self, new_entries):
+        DataManager.record_add(new_entries)
+        st.session_state.pantry.append(new_entries)
+        st.session_state.analytics.added(new_entries)
+        st.session_state.restock.added_entries(new_entries)
+
+    def remove_from_pantry(self, index):
+        removed = st.session_state.pantry.pop(index)
+        DataManager.record_remove([removed])
+        st.session_state.analytics.removed([removed])
+        return removed
+
+    def remove_entries(self, entry_ids):
+        """Removes several pantry entries with a single storage write."""
+        pantry = st.session_state.pantry
+        removed = pantry.remove(pantry.positions_of(entry_ids))
+        if removed:
+            DataManager.record_remove(removed)
+            st.session_state.analytics.removed(removed)
+        return removed
+
+    def run_command(self, intent):
+        """Answers a locally routed chat command; returns the reply text."""
+        pantry = st.session_state.pantry
+        item = intent.item
+
+        if intent.action == "add":
+            st.session_state.add_flow_item = item
+            msg = f"🛒 Okay, let's add **{item}**. What is the **Price (LKR)** and **Shelf Life (Days)**? (e.g., type '1500 2')"
+            if intent.known:
+                msg += f"\n\nℹ️ **{item}** is already in your database; this will update it."
+            return msg
+
+        if intent.action == "expiring":
+            alerts = self.check_expiry_status()
+            if not alerts:
+                return "✅ Nothing in your pantry is expiring in the next few days."
+            return "\n".join(f"- {alert}" for alert in alerts)
+
+        if intent.action == "stock":
+            # Every pantry item the name covers ("milk" -> "Highland Milk Packet")
+            counts = {name: self.check_pantry_stock(name) for name in intent.names}
+            in_stock = sum(counts.values())
+            if in_stock:
+                msg = f"📦 You have **{in_stock}** × **{item}** in your pantry"
+                if len(counts) > 1:
+                    msg += ": " + ", ".join(f"{name} ×{n}" for name, n in counts.items() if n)
+                return msg + "."
+            codes = [pantry.item_code(name) for name in intent.names]
+            if np.isin(pantry.item_codes, codes).any():
+                return f"❌ Your **{item}** has expired. Time to restock?"
+            return f"🤷 There is no **{item}** in your pantry."
+
+        code = pantry.item_code(item)
+        positions = np.flatnonzero(pantry.item_codes == code) if code is not None else []
+
+        # remove: the entry that expires first
+        if not len(positions):
+            return f"🤷 There is no **{item}** in your pantry."
+        position = int(positions[np.argmin(pantry.expiry_days[positions])])
+        removed = self.remove_from_pantry(position)
+        return f"🗑️ Removed **{item}** (expires {removed['expiry_date'].strftime('%Y-%m-%d')}) from your pantry."
 
     def analyze_cart_add(self, item_name):
-        details = ALL_PRODUCTS.get(item_name)
+        details = CATALOG.get(item_name)
         if not details:
             return None
         if not details['healthy'] and details['alt']:
@@ -219,89 +251,57 @@ class SmartAgent:
         return None
 
     def add_item(self, item_name):
-        details = ALL_PRODUCTS.get(item_name)
+        details = CATALOG.get(item_name)
         if details:
-            st.session_state.shopping_list.append({
-                "item": item_name,
-                "category": details['category'],
-                "price": details['price'],
-                "status": "Pending"
-            })
+            st.session_state.cart.add(item_name, details)
         else:
             st.error(f"⚠️ Database Error: '{item_name}' not found.")
 
     def extract_details_from_text(self, text):
+        details = detail_parser.parse(text)
+        if details is not None:
+            return details
+
         prompt = f"""
         Extract the 'price' (number) and 'days' (number) from this text: "{text}".
         If missing, return null.
         Return JSON: {{ "price": number_or_null, "days": number_or_null }}
         """
+        key = response_cache.make_key("extract_details", normalize_text(text))
         try:
-            response = model.generate_content(prompt)
-            cleaned = response.text.replace(
-                "```json", "").replace("```", "").strip()
-            return json.loads(cleaned)
+            return response_cache.get_or_compute(
+                key, lambda: parse_json_response(model.generate_content(prompt).text))
         except:
             return {"price": None, "days": None}
 
     def analyze_new_product(self, name, current_products_list, existing_categories):
-        prompt = f"""
-        I am adding a new product: "{name}".
-        
-        Current Database items: {current_products_list}
-        Existing Categories: {existing_categories}
-        
-        Task:
-        1. Is "{name}" healthy? (true/false)
-        2. Find the BEST alternative.
-           - First, look in the Current Database.
-           - IF NO GOOD MATCH EXISTS: Invent a new, realistic healthy alternative available in Sri Lanka.
-           - Example: If input is "Chicken Burger", substitute could be "Grilled Chicken Salad".
-        
-        3. If you INVENT a new alternative, estimate its details.
-           - CRITICAL: For "category", you MUST pick one from the 'Existing Categories' list provided above. 
-             Only invent a new category if the item absolutely cannot fit into any existing one (e.g., trying to put 'Chicken' into 'Beverages').
-        
-        Return JSON ONLY:
-        {{
-            "input_product": {{
-                "healthy": true/false,
-                "price": 100,
-                "days_to_expire": 3,
-                "category": "Exact Category Name"
-            }},
-            "alt_name": "Name of alternative" or null,
-            "alt_source": "existing" or "new",
-            "new_product_details": {{ 
-                "price": 100, 
-                "days_to_expire": 7, 
-                "category": "Exact Category Name"
-            }}
-        }}
-        """
+        prompt = analyze_product_prompt(
+            name, current_products_list, existing_categories)
+        # Keyed on the catalog's contents rather than catalog_version, which
+        # restarts at 0 with the process and would orphan the disk cache.
+        key = response_cache.make_key(
+            "analyze_new_product", normalize_text(name),
+            fingerprint(current_products_list), sorted(existing_categories))
         try:
-            response = model.generate_content(prompt)
-            cleaned_text = response.text.replace(
-                "```json", "").replace("```", "").strip()
-            return json.loads(cleaned_text)
+            return response_cache.get_or_compute(
+                key, lambda: parse_json_response(model.generate_content(prompt).text))
         except Exception as e:
             return {"input_product": {"healthy": True, "price": 0, "days_to_expire": 0, "category": "Unknown"}, "alt_name": None}
 
     def get_context_string(self):
-        """Creates a string summary of the current pantry and cart for the AI"""
-        sim_date = self.get_simulation_date().strftime('%Y-%m-%d')
-
-        pantry_items = [f"{i['item']} (Expires: {i['expiry_date'].strftime('%Y-%m-%d')}, Status: {i['status']})"
-                        for i in st.session_state.pantry]
-
-        cart_items = [i['item'] for i in st.session_state.shopping_list]
-
-        context = f"""
-        Current Date: {sim_date}
-        My Pantry Inventory: {', '.join(pantry_items) if pantry_items else 'Empty'}
-        My Shopping List: {', '.join(cart_items) if cart_items else 'Empty'}
-        """
-        return context
+        """Creates a compact summary of the current pantry and cart for the
+        AI, rebuilt only when the pantry, cart or simulated day changes"""
+        self.check_expiry_status()
+        pantry = st.session_state.pantry
+        sim_date = self.get_simulation_date()
+        cart = st.session_state.cart
+        key = (id(pantry), pantry.version, id(cart), cart.version,
+               sim_date.date(), self.CONTEXT_TOKENS)
+        if st.session_state.get('context_key') != key:
+            st.session_state.context = pantry_context(
+                pantry.item_overview(), sim_date, cart.counts(), self.CONTEXT_TOKENS)
+            st.session_state.context_key = key
+        return st.session_state.context
 
 
 # ==========================================
@@ -312,7 +312,8 @@ st.set_page_config(page_title="Smart Grocery Agent",
 
 load_custom_styles()
 
-agent = SmartAgent()
+with metrics.span("agent_init"):
+    agent = SmartAgent()
 
 # ==========================================
 # 💬 PART 4: POPUPS (CHAT & ADD/EDIT ITEM)
@@ -333,7 +334,7 @@ def open_add_product_modal():
         with st.form("new_product_form"):
             new_name = st.text_input(
                 "Product Name", placeholder="e.g. Chicken Burger")
-            existing_cats = list(PRODUCT_CATALOG.keys())
+            existing_cats = CATALOG.categories()
             new_category = st.selectbox("Category", existing_cats)
             new_price = st.number_input("Price (LKR)", min_value=0, value=500)
             new_expiry_days = st.number_input(
@@ -341,12 +342,12 @@ def open_add_product_modal():
             submitted = st.form_submit_button("Save New Product")
 
             if submitted and new_name:
-                if new_name in ALL_PRODUCTS:
+                if new_name in CATALOG:
                     st.error(
                         f"'{new_name}' already exists! Switch to Edit mode to update it.")
                 else:
                     with st.spinner("AI is analyzing & generating alternatives..."):
-                        current_keys = list(ALL_PRODUCTS.keys())
+                        current_keys = CATALOG.shortlist(new_name)
                         ai_result = agent.analyze_new_product(
                             new_name, current_keys, existing_cats)
                         final_alt_name = ai_result.get('alt_name')
@@ -360,11 +361,7 @@ def open_add_product_modal():
                                 "alt": None
                             }
                             cat = details['category']
-                            if cat not in PRODUCT_CATALOG:
-                                PRODUCT_CATALOG[cat] = {}
-                            PRODUCT_CATALOG[cat][final_alt_name] = new_healthy_item
-                            ALL_PRODUCTS[final_alt_name] = new_healthy_item
-                            ALL_PRODUCTS[final_alt_name]['category'] = cat
+                            CATALOG.upsert(final_alt_name, new_healthy_item, cat)
                             st.toast(
                                 f"🎉 AI auto-created: {final_alt_name} ({cat})")
 
@@ -375,13 +372,8 @@ def open_add_product_modal():
                             "alt": final_alt_name
                         }
 
-                        if new_category in PRODUCT_CATALOG:
-                            PRODUCT_CATALOG[new_category][new_name] = user_item_entry
-                        else:
-                            PRODUCT_CATALOG[new_category] = {
-                                new_name: user_item_entry}
-
-                        DataManager.save_catalog(PRODUCT_CATALOG)
+                        CATALOG.upsert(new_name, user_item_entry, new_category)
+                        DataManager.save_catalog(CATALOG.to_dict())
                         st.success(f"Added {new_name} successfully!")
                         time.sleep(1.5)
                         # st.rerun()
@@ -392,18 +384,23 @@ def open_add_product_modal():
     else:
         st.caption("Update details for items already in your database.")
 
-        all_item_names = sorted(list(ALL_PRODUCTS.keys()))
+        all_item_names = sorted(CATALOG.names())
         selected_item_name = st.selectbox(
             "Select Item to Edit", all_item_names)
 
         if selected_item_name:
-            current_details = ALL_PRODUCTS[selected_item_name]
+            current_details = CATALOG.get(selected_item_name)
             current_cat = current_details.get('category', 'Pantry Staples')
             current_price = current_details.get('price', 0)
             current_expiry = current_details.get('days_to_expire', 7)
 
+            referrers = CATALOG.referencing(selected_item_name)
+            if referrers:
+                st.caption(
+                    f"💚 Suggested as the healthier choice for: {', '.join(referrers)}")
+
             with st.form("edit_product_form"):
-                existing_cats = list(PRODUCT_CATALOG.keys())
+                existing_cats = CATALOG.categories()
                 cat_index = existing_cats.index(
                     current_cat) if current_cat in existing_cats else 0
 
@@ -421,19 +418,9 @@ def open_add_product_modal():
                     updated_entry['price'] = edit_price
                     updated_entry['days_to_expire'] = edit_expiry
 
-                    if edit_category != current_cat:
-                        if current_cat in PRODUCT_CATALOG and selected_item_name in PRODUCT_CATALOG[current_cat]:
-                            del PRODUCT_CATALOG[current_cat][selected_item_name]
-
-                        if edit_category not in PRODUCT_CATALOG:
-                            PRODUCT_CATALOG[edit_category] = {}
-                        PRODUCT_CATALOG[edit_category][selected_item_name] = updated_entry
-
-                        updated_entry['category'] = edit_category
-                    else:
-                        PRODUCT_CATALOG[edit_category][selected_item_name] = updated_entry
-
-                    DataManager.save_catalog(PRODUCT_CATALOG)
+                    CATALOG.upsert(selected_item_name,
+                                   updated_entry, edit_category)
+                    DataManager.save_catalog(CATALOG.to_dict())
                     st.success(
                         f"✅ Updated '{selected_item_name}' successfully!")
                     time.sleep(1.5)
@@ -448,19 +435,31 @@ def open_chat_modal():
             "👋 *I can help you plan meals, check expiry dates, or **Add** new items!*")
     with c2:
         if st.button("🗑️ Clear", help="Clear Chat History"):
-            st.session_state.chat_history = []
+            st.session_state.chat_history = ChatHistory()
+            st.session_state.chat_session = ChatSession()
+            st.session_state.chat_window = ChatHistory.PAGE
             st.session_state.add_flow_item = None
 
     st.divider()
 
     chat_container = st.container(height=400)
+    history = st.session_state.chat_history
 
     with chat_container:
-        if not st.session_state.chat_history:
+        if not history:
             st.info(
                 "💡 Tip: Type 'Add Pizza' to start adding an item to the database.")
 
-        for message in st.session_state.chat_history:
+        shown = min(st.session_state.chat_window, history.available)
+        if shown < history.available:
+            if st.button(f"⬆️ Load earlier messages ({history.available - shown} more)"):
+                st.session_state.chat_window += ChatHistory.PAGE
+                shown = min(st.session_state.chat_window, history.available)
+        elif history.archived:
+            with st.expander(f"🗂️ {history.archived} earlier messages (summary)"):
+                st.text(history.summary)
+
+        for message in history.window(shown):
             avatar = "🤖" if message["role"] == "assistant" else "👤"
             with st.chat_message(message["role"], avatar=avatar):
                 st.markdown(message["content"])
@@ -483,8 +482,8 @@ def open_chat_modal():
                             st.markdown(
                                 f"🔄 Analyzing **{item_name}** and finding healthy alternatives...")
 
-                            current_keys = list(ALL_PRODUCTS.keys())
-                            existing_cats = list(PRODUCT_CATALOG.keys())
+                            current_keys = CATALOG.shortlist(item_name)
+                            existing_cats = CATALOG.categories()
 
                             ai_result = agent.analyze_new_product(
                                 item_name, current_keys, existing_cats)
@@ -500,16 +499,11 @@ def open_chat_modal():
                                     "alt": None
                                 }
                                 cat = det['category']
-                                if cat not in PRODUCT_CATALOG:
-                                    PRODUCT_CATALOG[cat] = {}
-
-                                PRODUCT_CATALOG[cat][final_alt_name] = new_alt_entry
-                                ALL_PRODUCTS[final_alt_name] = new_alt_entry
-                                ALL_PRODUCTS[final_alt_name]['category'] = cat
+                                CATALOG.upsert(final_alt_name, new_alt_entry, cat)
 
                             target_cat = "Pantry Staples"
                             if final_alt_name:
-                                target_cat = ALL_PRODUCTS.get(final_alt_name, {}).get(
+                                target_cat = CATALOG.get(final_alt_name, {}).get(
                                     'category', 'Pantry Staples')
 
                             user_entry = {
@@ -519,14 +513,8 @@ def open_chat_modal():
                                 "alt": final_alt_name
                             }
 
-                            if target_cat not in PRODUCT_CATALOG:
-                                PRODUCT_CATALOG[target_cat] = {}
-                            PRODUCT_CATALOG[target_cat][item_name] = user_entry
-
-                            ALL_PRODUCTS[item_name] = user_entry
-                            ALL_PRODUCTS[item_name]['category'] = target_cat
-
-                            DataManager.save_catalog(PRODUCT_CATALOG)
+                            CATALOG.upsert(item_name, user_entry, target_cat)
+                            DataManager.save_catalog(CATALOG.to_dict())
 
                             success_msg = f"✅ **Saved {item_name}** to database!\n\n" \
                                 f"💰 Price: {extracted['price']} | ⏳ Days: {extracted['days']}\n" \
@@ -545,23 +533,29 @@ def open_chat_modal():
                             st.session_state.chat_history.append(
                                 {"role": "assistant", "content": err_msg})
 
+                    elif intent := chat_router.route(
+                            prompt, CATALOG.names(), st.session_state.pantry.item_names):
+                        reply = agent.run_command(intent)
+                        st.session_state.chat_session.note_exchange(
+                            prompt, reply, agent.get_context_string())
+                        st.markdown(reply)
+                        st.session_state.chat_history.append(
+                            {"role": "assistant", "content": reply})
+
                     else:
-                        context_data = agent.get_context_string()
-                        system_instruction = f"""
-                        You are a smart grocery assistant. 
-                        Context: {context_data}
-                        
-                        COMMAND RULE:
-                        If user wants to ADD a new item (e.g. "Add Pizza", "Save Apples"), return ONLY JSON:
-                        {{"action": "start_add", "item": "Pizza"}}
-                        
-                        Otherwise, answer normally as a friendly assistant.
-                        """
+                        session = st.session_state.chat_session
+                        contents = session.next_message(
+                            prompt, agent.get_context_string())
 
                         try:
-                            response = model.generate_content(
-                                f"{system_instruction}\nUser: {prompt}")
-                            text_response = response.text
+                            # Render tokens as they arrive, except while the
+                            # reply may still turn out to be a JSON command
+                            reply = StreamedReply(model, contents)
+                            bubble = st.empty()
+                            for _ in reply:
+                                if not reply.maybe_json:
+                                    bubble.markdown(reply.text + "▌")
+                            text_response = reply.text
 
                             command = None
                             try:
@@ -572,18 +566,21 @@ def open_chat_modal():
                             except:
                                 pass
 
+                            session.record_reply(text_response)
+
                             if command and command.get('action') == "start_add":
                                 item = command['item']
                                 st.session_state.add_flow_item = item
                                 msg = f"🛒 Okay, let's add **{item}**. What is the **Price (LKR)** and **Shelf Life (Days)**? (e.g., type '1500 2')"
-                                st.markdown(msg)
+                                bubble.markdown(msg)
                                 st.session_state.chat_history.append(
                                     {"role": "assistant", "content": msg})
                             else:
-                                st.markdown(text_response)
+                                bubble.markdown(text_response)
                                 st.session_state.chat_history.append(
                                     {"role": "assistant", "content": text_response})
                         except Exception as e:
+                            session.discard_turn()
                             st.error(f"Error: {e}")
 
 
@@ -594,8 +591,10 @@ def open_chat_modal():
 # --- SIDEBAR ---
 with st.sidebar:
     st.header("⚙️ Simulation Controls")
-    days_offset = st.slider("Fast Forward Time (Days)", 0, 14, 0)
-    sim_date = datetime.now() + timedelta(days=days_offset)
+    days_offset = st.slider(
+        "Fast Forward Time (Days)", 0, SmartAgent.SLIDER_DAYS, 0)
+    with metrics.span("timeline"):
+        sim_date = agent.get_timeline().date_at(days_offset)
     st.session_state['sim_date'] = sim_date
     st.markdown(f"**Date:** `{sim_date.strftime('%Y-%m-%d')}`")
     st.divider()
@@ -612,6 +611,23 @@ with st.sidebar:
 
     st.divider()
     st.info("💡 Tip: Use the slider to test Expiry & Restock logic.")
+    st.caption(
+        f"Catalog cache: {catalog_cache.hits} hits / {catalog_cache.misses} misses")
+    ai_cache = response_cache.stats()
+    st.caption(
+        f"AI cache: {ai_cache['hits']} hits / {ai_cache['misses']} misses "
+        f"({ai_cache['hit_rate']:.0%}), ~{ai_cache['saved_seconds']:.1f}s saved")
+    st.caption(
+        f"Price/days parsing: {detail_parser.fast_path} local / "
+        f"{detail_parser.fallback} via AI")
+    st.caption(
+        f"Chat commands: {chat_router.local} local / "
+        f"{chat_router.escalated} via AI")
+    if model is not None:
+        ai_calls = model.metrics.snapshot()
+        st.caption(
+            f"AI calls: {ai_calls['calls']} ({ai_calls['coalesced']} shared, "
+            f"{ai_calls['retries']} retried), p50 {ai_calls['p50_s']:.1f}s")
 
 # --- MAIN PAGE HEADER ---
 st.title("🛒 Smart Grocery Assistant")
@@ -620,8 +636,8 @@ st.title("🛒 Smart Grocery Assistant")
 if 'last_alert_count' not in st.session_state:
     st.session_state['last_alert_count'] = -1
 
-expiry_alerts = agent.check_expiry_status()
-prediction_alerts = agent.predict_needs()
+with metrics.span("alerts"):
+    expiry_alerts, prediction_alerts = agent.get_alerts(days_offset)
 current_alert_count = len(expiry_alerts) + len(prediction_alerts)
 
 if current_alert_count > 0 and current_alert_count != st.session_state['last_alert_count']:
@@ -636,14 +652,14 @@ tab1, tab2, tab3, tab4 = st.tabs(
     ["🛍️ Shop Now", "🏠 My Pantry", "📊 Analytics", "🔔 Notifications"])
 
 # === TAB 1: SHOPPING ===
-with tab1:
+with tab1, metrics.span("tab", tab="shop"):
     col1, col2 = st.columns([1, 2])
     with col1:
         st.subheader("Add Items")
-        if PRODUCT_CATALOG:
+        if CATALOG:
             category = st.selectbox(
-                "Select Category", list(PRODUCT_CATALOG.keys()))
-            items_in_cat = list(PRODUCT_CATALOG[category].keys())
+                "Select Category", CATALOG.categories())
+            items_in_cat = CATALOG.items_in(category)
             selected_item = st.selectbox("Select Item", items_in_cat)
 
             if st.button("Add to Cart", use_container_width=True):
@@ -704,139 +720,187 @@ with tab1:
 
     with col2:
         st.subheader("📝 Shopping List")
-        if st.session_state.shopping_list:
-            h1, h2, h3 = st.columns([3, 1, 1])
+        cart = st.session_state.cart
+        if cart:
+            h1, h2, h3, h4, h5 = st.columns([3, 1, 1.5, 1, 0.7])
             h1.markdown("**Item**")
             h2.markdown("**Price**")
-            h3.markdown("**Action**")
+            h3.markdown("**Qty**")
+            h4.markdown("**Total**")
             st.divider()
 
-            index_to_remove = None
-            for i, item in enumerate(st.session_state.shopping_list):
-                c1, c2, c3 = st.columns([3, 1, 1])
-                c1.write(item['item'])
-                c2.write(f"{item['price']}")
-                if c3.button("🗑️", key=f"remove_{i}"):
-                    index_to_remove = i
-
-            if index_to_remove is not None:
-                del st.session_state.shopping_list[index_to_remove]
-                st.rerun()
+            # Keys carry the cart version so every stepper shows the cart's
+            # quantity after a change made elsewhere (e.g. "Add to Cart")
+            for line in list(cart):
+                c1, c2, c3, c4, c5 = st.columns([3, 1, 1.5, 1, 0.7])
+                c1.write(line['item'])
+                c2.write(f"{line['price']}")
+                qty_key = f"qty_{cart.version}_{line['item']}"
+                c3.number_input(
+                    "Quantity", min_value=0, step=1, value=line['qty'],
+                    key=qty_key, label_visibility="collapsed",
+                    on_change=lambda name=line['item'], key=qty_key:
+                        cart.set_quantity(name, st.session_state[key]))
+                c4.write(f"{line['price'] * line['qty']}")
+                c5.button("🗑️", key=f"remove_{line['item']}",
+                          on_click=cart.remove, args=(line['item'],))
 
             st.divider()
-            total_price = sum(i['price']
-                              for i in st.session_state.shopping_list)
-            st.markdown(f"### Total: LKR {total_price}")
+            st.markdown(f"### Total: LKR {cart.total}")
+            st.caption(" · ".join(f"{cat}: LKR {amount}"
+                                  for cat, amount in sorted(cart.subtotals.items())))
 
             col_checkout, col_clear = st.columns(2)
             with col_checkout:
                 if st.button("✅ Checkout", use_container_width=True):
-                    for row in st.session_state.shopping_list:
-                        details = ALL_PRODUCTS.get(row['item'])
-                        if details:
-                            new_pantry_item = {
-                                "item": row['item'],
-                                "buy_date": sim_date,
-                                "expiry_date": sim_date + timedelta(days=details['days_to_expire']),
-                                "status": "Good"
-                            }
-                            st.session_state.pantry.append(new_pantry_item)
-
-                    DataManager.save_history(st.session_state.pantry)
-                    st.session_state.shopping_list = []
+                    total_price = cart.total
+                    agent.add_to_pantry(cart.pantry_entries(sim_date))
+                    cart.clear()
                     st.balloons()
                     st.success(f"Checkout Complete! Total: LKR {total_price}")
                     st.rerun()
 
             with col_clear:
                 if st.button("🗑️ Clear Cart", use_container_width=True):
-                    st.session_state.shopping_list = []
+                    cart.clear()
                     st.warning("Cart cleared.")
                     st.rerun()
         else:
             st.info("List is empty.")
 
 # === TAB 2: PANTRY ===
-with tab2:
+PANTRY_SORTS = {
+    "Expiry (soonest)": ("expiry", False),
+    "Expiry (latest)": ("expiry", True),
+    "Buy date (newest)": ("buy", True),
+    "Item name": ("item", False),
+}
+STATUS_LABELS = {"Expired": "🔴 Expired", "Critical": "🟠 Critical",
+                 "Expiring Soon": "🟠 Expiring Soon", "Good": "🟢 Good"}
+
+with tab2, metrics.span("tab", tab="pantry"):
     st.subheader("🏠 Pantry Inventory")
-    if st.session_state.pantry:
-        h1, h2, h3, h4, h5 = st.columns([2, 1.5, 1.5, 1.5, 0.5])
-        h1.markdown("**Item**")
-        h2.markdown("**Buy Date**")
-        h3.markdown("**Expiry Date**")
-        h4.markdown("**Status**")
-        h5.markdown("**Action**")
-        st.divider()
-
-        index_to_remove = None
-        for i, entry in enumerate(st.session_state.pantry):
-            c1, c2, c3, c4, c5 = st.columns([2, 1.5, 1.5, 1.5, 0.5])
-            buy_str = entry['buy_date'].strftime('%Y-%m-%d')
-            exp_str = entry['expiry_date'].strftime('%Y-%m-%d')
-            status = entry['status']
-            color = "green"
-            if status == "Expired":
-                color = "red"
-            elif status == "Critical":
-                color = "orange"
-            elif status == "Expiring Soon":
-                color = "orange"
-
-            c1.write(entry['item'])
-            c2.write(buy_str)
-            c3.write(exp_str)
-            c4.markdown(f":{color}[{status}]")
-            if c5.button("🗑️", key=f"delete_pantry_{i}"):
-                index_to_remove = i
-
-        if index_to_remove is not None:
-            removed = st.session_state.pantry.pop(index_to_remove)
-            DataManager.save_history(st.session_state.pantry)
-            st.warning(f"Removed {removed['item']} from pantry.")
+    pantry = st.session_state.pantry
+    if pantry:
+        # pandas (~0.5s to import) is only loaded once there is a table
+        # or chart to draw; Streamlit itself imports it lazily too
+        import pandas as pd
+        f1, f2, f3 = st.columns([3, 1.5, 1])
+        shown_statuses = f1.multiselect(
+            "Status", BUCKET_NAMES, default=list(BUCKET_NAMES))
+        sort_label = f2.selectbox("Sort by", list(PANTRY_SORTS))
+        page_size = f3.selectbox("Rows per page", [25, 50, 100], index=1)
+
+        # Filtering, sorting and paging run on the arrays; only the visible
+        # page is turned into a DataFrame and sent to the browser
+        positions = pantry.select(shown_statuses, *PANTRY_SORTS[sort_label])
+        pages = max(1, -(-len(positions) // page_size))
+        page = st.number_input(f"Page (of {pages})", min_value=1,
+                               max_value=pages, value=1)
+        start = (page - 1) * page_size
+        page_positions = positions[start:start + page_size]
+
+        table = pd.DataFrame(pantry.columns(page_positions))
+        table["status"] = table["status"].map(STATUS_LABELS)
+        table.insert(0, "delete", False)
+        edited = st.data_editor(
+            table,
+            hide_index=True,
+            use_container_width=True,
+            disabled=["item", "buy_date", "expiry_date", "status"],
+            column_config={
+                "id": None,
+                "delete": st.column_config.CheckboxColumn("🗑️", width="small"),
+                "item": "Item",
+                "buy_date": st.column_config.DateColumn("Buy Date"),
+                "expiry_date": st.column_config.DateColumn("Expiry Date"),
+                "status": "Status"
+            },
+            key=f"pantry_table_{pantry.version}_{tuple(shown_statuses)}_{sort_label}_"
+                f"{page}_{page_size}")
+        st.caption(f"Showing {start + 1 if len(page_positions) else 0}-"
+                   f"{start + len(page_positions)} of {len(positions)} entries")
+
+        selected = edited.loc[edited["delete"], "id"].tolist()
+        if st.button(f"🗑️ Delete selected ({len(selected)})", disabled=not selected):
+            removed = agent.remove_entries(selected)
+            st.warning(f"Removed {len(removed)} entries from pantry.")
             st.rerun()
     else:
         st.info("Pantry is empty.")
 
 # === TAB 3: ANALYTICS ===
-with tab3:
+
+
+# Vega-Lite specs with the rows inline: st.bar_chart would build them
+# through Altair (~0.5s to import, ~20ms per chart on every rerun)
+def spend_chart(spend_by_cat):
+    return {
+        "data": {"values": [{"Category": cat, "Price": value}
+                            for cat, value in spend_by_cat.items()]},
+        "mark": {"type": "bar", "color": "#4CAF50"},
+        "encoding": {
+            "x": {"field": "Category", "type": "nominal"},
+            "y": {"field": "Price", "type": "quantitative"},
+        },
+    }
+
+
+def trend_chart(trend):
+    return {
+        "data": {"values": [{"Start": start.date().isoformat(),
+                             "Category": cat, "Spend": value}
+                            for start, row in trend.items()
+                            for cat, value in row.items()]},
+        "mark": "bar",
+        "encoding": {
+            "x": {"field": "Start", "type": "temporal", "title": None},
+            "y": {"field": "Spend", "type": "quantitative", "aggregate": "sum"},
+            "color": {"field": "Category", "type": "nominal"},
+        },
+    }
+
+
+with tab3, metrics.span("tab", tab="analytics"):
     st.subheader("📊 Overview")
     if st.session_state.pantry:
-        pantry_data = []
-        for item in st.session_state.pantry:
-            details = ALL_PRODUCTS.get(item['item'], {})
-            pantry_data.append({
-                "Category": details.get('category', 'Unknown'),
-                "Price": details.get('price', 0),
-                "Healthy": details.get('healthy', False)
-            })
-        df = pd.DataFrame(pantry_data)
-
-        total_value = df['Price'].sum()
-        healthy_count = len(df[df['Healthy']])
-        total_items = len(df)
-        health_score = (healthy_count / total_items) * \
+        analytics = agent.pantry_analytics()
+        total_items = analytics.total_items
+        health_score = (analytics.healthy_count / total_items) * \
             100 if total_items > 0 else 0
 
         c1, c2, c3 = st.columns(3)
-        c1.metric("💰 Total Value", f"LKR {total_value}")
+        c1.metric("💰 Total Value", f"LKR {analytics.total_value}")
         c2.metric("❤️ Health Score", f"{health_score:.0f}%")
         c3.metric("📦 Item Count", total_items)
         st.divider()
         st.caption("💰 Spending Breakdown by Category")
-        spend_by_cat = df.groupby("Category")["Price"].sum()
-        st.bar_chart(spend_by_cat, color="#4CAF50")
+        st.vega_lite_chart(spend_chart(analytics.spend_by_cat),
+                           use_container_width=True)
+
+        st.caption("📅 Spending over time (by purchase date)")
+        period = st.radio("Period", PERIODS, index=2, horizontal=True,
+                          label_visibility="collapsed")
+        st.vega_lite_chart(trend_chart(analytics.trend(period)),
+                           use_container_width=True)
     else:
         st.info("No data available yet.")
 
 # === TAB 4: NOTIFICATIONS ===
-with tab4:
+# One element per alert; the full list is in the pantry table
+MAX_NOTIFICATIONS = 100
+
+with tab4, metrics.span("tab", tab="notifications"):
     st.subheader("🔔 Agent Notifications")
     col_alerts, col_suggestions = st.columns(2)
     with col_alerts:
         st.markdown("### ⚠️ Attention Needed")
         if expiry_alerts:
-            for alert in expiry_alerts:
+            for alert in expiry_alerts[:MAX_NOTIFICATIONS]:
                 st.error(alert)
+            if len(expiry_alerts) > MAX_NOTIFICATIONS:
+                st.caption(f"…and {len(expiry_alerts) - MAX_NOTIFICATIONS} more. "
+                           "Filter the 🏠 My Pantry tab by status to see them all.")
         else:
             st.success("Everything is fresh! ✅")
     with col_suggestions:
@@ -846,3 +910,44 @@ with tab4:
                 st.info(alert)
         else:
             st.success("No restock predictions needed yet. ✅")
+
+# === DIAGNOSTICS (GROCERY_METRICS=1, ?diagnostics=<token>) ===
+metrics.end_run()
+
+
+def span_label(row):
+    return " ".join([row["name"], *(f"{k}={v}" for k, v in row["labels"].items())])
+
+
+if SHOW_DIAGNOSTICS:
+    with st.sidebar.expander("🩺 Diagnostics", expanded=True):
+        import pandas as pd
+        runs = metrics.runs()
+        if runs:
+            last = runs[-1]
+            st.caption(f"Last run: {last['ms']:.0f} ms")
+            st.dataframe(pd.DataFrame(
+                [{"span": span_label(span), "ms": span["ms"]} for span in last["spans"]]),
+                hide_index=True, use_container_width=True)
+
+        rows = metrics.snapshot()
+        spans = [row for row in rows if row["type"] == "span"]
+        if spans:
+            st.caption("All runs")
+            st.dataframe(pd.DataFrame(
+                [{"span": span_label(row), "n": row["count"], "p50 ms": row["p50_ms"],
+                  "p95 ms": row["p95_ms"], "max ms": row["max_ms"]}
+                 for row in spans]),
+                hide_index=True, use_container_width=True)
+        for row in rows:
+            if row["type"] == "counter":
+                st.caption(f"{row['name']}: {row['value']}")
+
+        d1, d2, d3 = st.columns(3)
+        d1.download_button("JSONL", metrics.to_jsonl(), "metrics.jsonl",
+                           "application/json")
+        d2.download_button("Prometheus", metrics.to_prometheus(), "metrics.prom",
+                           "text/plain")
+        if d3.button("Reset"):
+            metrics.reset()
+            st.rerun()
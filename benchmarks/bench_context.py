@@ -0,0 +1,65 @@
+"""Chat context size: the old per-entry listing vs llm.pantry_context.
+
+    python benchmarks/bench_context.py [--entries 100 5000 50000] [--budget 400]
+
+Builds synthetic pantries (benchmarks/synthetic.py: 300 products, a year
+of purchases) and reports estimated tokens and build time for both formats.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from llm import estimate_tokens, pantry_context  # noqa: E402
+from pantry import PantryStore  # noqa: E402
+from synthetic import generate_catalog, generate_pantry  # noqa: E402
+
+
+def legacy_context(store, current_date, cart_items):
+    """get_context_string as it was: one clause per pantry entry."""
+    pantry_items = [f"{i['item']} (Expires: {i['expiry_date'].strftime('%Y-%m-%d')}, Status: {i['status']})"
+                    for i in store]
+    return f"""
+        Current Date: {current_date.strftime('%Y-%m-%d')}
+        My Pantry Inventory: {', '.join(pantry_items) if pantry_items else 'Empty'}
+        My Shopping List: {', '.join(cart_items) if cart_items else 'Empty'}
+        """
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, nargs="+", default=[100, 5000, 50_000])
+    parser.add_argument("--budget", type=int, default=400)
+    parser.add_argument("--products", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    today = datetime(2026, 1, 1)
+    catalog_data = generate_catalog(args.products, args.seed)
+    names = [name for products in catalog_data.values() for name in products]
+    cart = [names[0], names[1], names[1]]
+    print(f"{'entries':>8} {'old tokens':>11} {'old ms':>8} "
+          f"{'new tokens':>11} {'new ms':>8}")
+    for n_entries in args.entries:
+        store = PantryStore(generate_pantry(catalog_data, n_entries, today,
+                                            years=1, seed=args.seed))
+        store.expiry.refresh(today)
+        old, old_ms = timed(lambda: legacy_context(store, today, cart))
+        new, new_ms = timed(lambda: pantry_context(
+            store.item_overview(), today, cart, args.budget))
+        print(f"{n_entries:>8} {estimate_tokens(old):>11} {old_ms:>8.1f} "
+              f"{estimate_tokens(new):>11} {new_ms:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
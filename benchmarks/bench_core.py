@@ -0,0 +1,260 @@
+"""Time and peak memory of the grocery core at growing pantry sizes.
+
+    python benchmarks/bench_core.py [--entries 1000 10000 100000] [--out bench_results.json]
+    python benchmarks/bench_core.py --compare old.json     # after a change
+
+Runs the operations behind each SmartAgent method on synthetic data
+(benchmarks/synthetic.py), without Streamlit:
+
+    load_history / save_history   JsonBackend and SQLiteBackend, in a temp dir
+    check_expiry_status           ExpiryIndex.refresh, first pass and next day
+    predict_needs                 RestockEngine build, due() + restock_messages()
+    check_pantry_stock            StockCounter.in_stock, per 1000 lookups
+    get_context_string            item_overview() + pantry_context()
+    analytics                     PantryAnalytics build, price edit, trends
+    analyze_new_product           shortlist + prompt + StubModel + parse
+
+The model is the deterministic StubModel, so no API key is needed and
+runs are comparable. Each operation runs once untimed (unless it takes
+over a second), then --repeat times on fresh state; the median time is
+reported. Peak memory is the
+tracemalloc peak of one extra run (Python and numpy allocations).
+Results are written as JSON with the commit and library versions;
+--compare prints the ratio against an earlier file and flags slowdowns
+over 20%.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from analytics import PantryAnalytics  # noqa: E402
+from catalog import Catalog  # noqa: E402
+from llm import StubModel, analyze_product_prompt, parse_json_response, pantry_context  # noqa: E402
+from pantry import PantryStore  # noqa: E402
+from restock import RestockEngine, category_prior, restock_messages  # noqa: E402
+from storage import JsonBackend, SQLiteBackend  # noqa: E402
+from synthetic import generate_catalog, generate_pantry  # noqa: E402
+
+TODAY = datetime(2026, 1, 1)
+CART = {"Fresh Milk #1": 2, "Classic Bread #2": 1}
+NEW_PRODUCTS = ["Chicken Burger", "Chocolate Milk", "Kottu Roti", "Mango Juice"]
+SLOWER = 1.2
+# Operations slower than this count their first run instead of repeating it
+SLOW_RUN = 1.0
+
+
+def json_backend(directory):
+    return JsonBackend(os.path.join(directory, "products.json"),
+                       os.path.join(directory, "pantry_history.json"),
+                       os.path.join(directory, "pantry_history.jsonl"))
+
+
+def refreshed_store(entries, day=TODAY):
+    store = PantryStore(entries)
+    store.expiry.refresh(day)
+    return store
+
+
+def operations(entries, catalog_data, workdir):
+    """(name, prepare) pairs; prepare() does the setup for one run and
+    returns the zero-argument callable that is measured."""
+    catalog = Catalog(catalog_data)
+    names = list(dict.fromkeys(entry['item'] for entry in entries))
+    lookups = [names[i % len(names)] for i in range(1000)] if names else []
+    store = refreshed_store(entries)
+
+    json_dir = os.path.join(workdir, "json")
+    os.makedirs(json_dir, exist_ok=True)
+    json_backend(json_dir).save_history(entries)
+    sqlite_file = os.path.join(workdir, "grocery.db")
+    SQLiteBackend(sqlite_file).save_history(entries)
+
+    def save_json():
+        backend = json_backend(os.path.join(workdir, "json_save"))
+        os.makedirs(os.path.dirname(backend.history_file), exist_ok=True)
+        return lambda: backend.save_history(entries)
+
+    def save_sqlite():
+        backend = SQLiteBackend(os.path.join(workdir, "save.db"))
+        return lambda: backend.save_history(entries)
+
+    def expiry_first():
+        fresh = PantryStore(entries)
+        return lambda: fresh.expiry.refresh(TODAY)
+
+    def expiry_next_day():
+        fresh = refreshed_store(entries)
+        return lambda: fresh.expiry.refresh(TODAY + timedelta(days=1))
+
+    def restock_due():
+        engine = RestockEngine(store, category_prior(catalog))
+        return lambda: restock_messages(engine.due(TODAY), catalog)
+
+    def analytics_price_edit():
+        analytics = PantryAnalytics(store, catalog, 0)
+        edited = Catalog(catalog_data)
+        product = edited.get(names[0])
+        edited.upsert(names[0], dict(product, price=product['price'] + 10),
+                      product['category'])
+        return lambda: analytics.sync_catalog(edited, 1)
+
+    def analytics_trend():
+        analytics = PantryAnalytics(store, catalog, 0)
+        return lambda: [analytics.trend(period) for period in
+                        ("Daily", "Weekly", "Monthly")]
+
+    def analyze_new_product():
+        model = StubModel()
+        categories = catalog.categories()
+
+        def run():
+            for name in NEW_PRODUCTS:
+                prompt = analyze_product_prompt(
+                    name, catalog.shortlist(name), categories)
+                parse_json_response(model.generate_content(prompt).text)
+        return run
+
+    return [
+        ("load_history/json", lambda: json_backend(json_dir).load_history),
+        ("save_history/json", save_json),
+        ("load_history/sqlite", lambda: SQLiteBackend(sqlite_file).load_history),
+        ("save_history/sqlite", save_sqlite),
+        ("pantry_store/build", lambda: lambda: PantryStore(entries)),
+        ("check_expiry_status/first", expiry_first),
+        ("check_expiry_status/next_day", expiry_next_day),
+        ("predict_needs/build", lambda: lambda: RestockEngine(store, category_prior(catalog))),
+        ("predict_needs/due", restock_due),
+        ("check_pantry_stock/x1000",
+         lambda: lambda: [store.stock.in_stock(name) for name in lookups]),
+        ("get_context_string",
+         lambda: lambda: pantry_context(store.item_overview(), TODAY, CART)),
+        ("analytics/build", lambda: lambda: PantryAnalytics(store, catalog, 0)),
+        ("analytics/price_edit", analytics_price_edit),
+        ("analytics/trends", analytics_trend),
+        ("analyze_new_product/x4", analyze_new_product),
+    ]
+
+
+def timed(fn):
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def measure(prepare, repeat, memory=True):
+    times = [timed(prepare())]
+    if times[0] < SLOW_RUN:
+        times = []  # just a warm-up: first-call imports and allocations
+    while len(times) < repeat:
+        times.append(timed(prepare()))
+    if not memory:
+        return statistics.median(times), None
+
+    fn = prepare()
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        fn()
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+    return statistics.median(times), peak
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+            text=True, cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, products, repeat, seed, memory=True):
+    catalog_data = generate_catalog(products, seed)
+    results = []
+    for n_entries in sizes:
+        entries = generate_pantry(catalog_data, n_entries, TODAY, seed=seed)
+        workdir = tempfile.mkdtemp(prefix="grocery-bench-")
+        try:
+            for name, prepare in operations(entries, catalog_data, workdir):
+                seconds, peak = measure(prepare, repeat, memory)
+                peak_mb = round(peak / 2 ** 20, 3) if peak is not None else None
+                results.append({"op": name, "entries": n_entries,
+                                "seconds": round(seconds, 6),
+                                "peak_mb": peak_mb})
+                print(f"{name:<30} {n_entries:>9} {seconds * 1000:>11.2f} "
+                      f"{'-' if peak_mb is None else f'{peak_mb:.2f}':>9}", flush=True)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {(r['op'], r['entries']): r for r in json.load(f)['results']}
+    print(f"\n{'op':<30} {'entries':>9} {'old ms':>11} {'new ms':>11} {'ratio':>7}")
+    for result in results:
+        old = baseline.get((result['op'], result['entries']))
+        if old is None or not old['seconds']:
+            continue
+        ratio = result['seconds'] / old['seconds']
+        flag = "  slower" if ratio > SLOWER else ""
+        print(f"{result['op']:<30} {result['entries']:>9} "
+              f"{old['seconds'] * 1000:>11.2f} {result['seconds'] * 1000:>11.2f} "
+              f"{ratio:>6.2f}x{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, nargs="+",
+                        default=[1000, 10_000, 100_000],
+                        help="pantry sizes (up to 1000000)")
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--compare", help="earlier results file to compare with")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="skip the tracemalloc run (much faster at 1M entries)")
+    args = parser.parse_args()
+
+    print(f"{'op':<30} {'entries':>9} {'median ms':>11} {'peak MB':>9}")
+    results = run(args.entries, args.products, args.repeat, args.seed,
+                  memory=not args.no_memory)
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "products": args.products,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {args.out}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
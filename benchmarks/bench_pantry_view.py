@@ -0,0 +1,71 @@
+"""Render time of the app with a large pantry, via Streamlit's AppTest.
+
+    python benchmarks/bench_pantry_view.py [--entries 1000 10000 100000]
+
+For each size, writes a synthetic catalog and pantry
+(benchmarks/synthetic.py) next to a copy of the app, then times the first run (which also loads the history) and a
+rerun that switches the pantry page. Needs no Gemini key.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import write_dataset  # noqa: E402
+
+
+def run(n_entries, n_products, seed):
+    workdir = tempfile.mkdtemp()
+    for name in os.listdir(ROOT):
+        if name.endswith((".py", ".json")):
+            shutil.copy(os.path.join(ROOT, name), workdir)
+    os.makedirs(os.path.join(workdir, ".streamlit"))
+    with open(os.path.join(workdir, ".streamlit", "secrets.toml"), "w") as f:
+        f.write('GEMINI_API_KEY = ""\n')
+    write_dataset(workdir, n_products, n_entries, datetime.now(), seed=seed)
+
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    sys.path.insert(0, workdir)
+    try:
+        app = AppTest.from_file(os.path.join(workdir, "app.py"), default_timeout=600)
+        started = time.perf_counter()
+        app.run()
+        first = time.perf_counter() - started
+
+        page = [n for n in app.number_input if n.label.startswith("Page")][0]
+        started = time.perf_counter()
+        page.set_value(2).run()
+        rerun = time.perf_counter() - started
+        assert not app.exception, app.exception
+    finally:
+        os.chdir(cwd)
+        sys.path.remove(workdir)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return first, rerun
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, nargs="+", default=[1000, 10_000, 100_000])
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'entries':>8} {'first run s':>12} {'page rerun s':>13}")
+    for n_entries in args.entries:
+        first, rerun = run(n_entries, args.products, args.seed)
+        print(f"{n_entries:>8} {first:>12.2f} {rerun:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
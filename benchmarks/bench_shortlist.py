@@ -0,0 +1,79 @@
+"""Prompt size and shortlist latency for analyze_new_product.
+
+Compares sending the whole catalog in the prompt against
+Catalog.shortlist() on synthetic catalogs (benchmarks/synthetic.py) of
+100, 10k and 100k products:
+
+    python benchmarks/bench_shortlist.py [--sizes 100 10000 100000] [--k 40]
+
+Tokens are estimated at 4 characters per token. Model latency is not
+measured (it needs an API key); it grows with prompt tokens.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from catalog import Catalog  # noqa: E402
+from llm import analyze_product_prompt  # noqa: E402
+from synthetic import generate_catalog  # noqa: E402
+
+QUERIES = ["Chicken Burger", "Chocolate Milk", "Kottu Roti", "Mango Juice",
+           "Cheese Sandwich", "Fried Rice", "Fish Curry", "Oat Cookies"]
+
+
+def prompt_tokens(products, categories):
+    return len(analyze_product_prompt("Chicken Burger", products, categories)) // 4
+
+
+def run(size, k, seed=0):
+    data = generate_catalog(size, seed)
+    started = time.perf_counter()
+    catalog = Catalog(data)
+    build_s = time.perf_counter() - started
+
+    timings = []
+    for query in QUERIES:
+        started = time.perf_counter()
+        shortlist = catalog.shortlist(query, k)
+        timings.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    catalog.upsert("Beef Burger", {"price": 900, "days_to_expire": 2,
+                                   "healthy": False, "alt": None}, "Bakery & Snacks")
+    catalog.remove("Beef Burger")
+    edit_s = time.perf_counter() - started
+
+    categories = catalog.categories()
+    return {
+        "size": size,
+        "full_tokens": prompt_tokens(catalog.names(), categories),
+        "shortlist_tokens": prompt_tokens(shortlist, categories),
+        "build_ms": build_s * 1000,
+        "shortlist_ms": statistics.median(timings) * 1000,
+        "edit_ms": edit_s * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[100, 10_000, 100_000])
+    parser.add_argument("--k", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'products':>9} {'full prompt':>12} {'shortlist':>10} "
+          f"{'build ms':>9} {'query ms':>9} {'edit ms':>8}")
+    for size in args.sizes:
+        r = run(size, args.k, args.seed)
+        print(f"{r['size']:>9} {r['full_tokens']:>12} {r['shortlist_tokens']:>10} "
+              f"{r['build_ms']:>9.1f} {r['shortlist_ms']:>9.2f} {r['edit_ms']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
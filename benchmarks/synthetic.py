@@ -0,0 +1,164 @@
+"""Reproducible synthetic catalogs and pantries.
+
+    python benchmarks/synthetic.py --products 2000 --entries 100000 --out /tmp/grocery
+
+writes products.json and pantry_history.json into --out, so the app can
+be run against them (start streamlit from that directory). The same seed
+always gives the same data.
+
+Catalogs follow the app's six categories, each with its own share of the
+catalog, price level, shelf life range and share of healthy products.
+Pantries are built from shopping trips: trips are more frequent on
+weekends and in recent months, a few products account for most purchases
+(Zipf-like popularity), and each entry expires after its product's shelf
+life, give or take 20%.
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from storage import JsonBackend  # noqa: E402
+
+# Category -> (share of products and purchases, median price (LKR),
+#              shelf life range (days), share of healthy products, foods)
+CATEGORIES = {
+    "Produce": (0.22, 300, (3, 14), 0.9,
+                ["Banana", "Mango", "Carrots", "Beans", "Pumpkin", "Onions",
+                 "Gotukola", "Tomatoes", "Leeks", "Papaya"]),
+    "Dairy & Chill": (0.18, 250, (5, 21), 0.6,
+                      ["Milk", "Yogurt", "Cheese", "Butter", "Curd", "Eggs",
+                       "Sausages"]),
+    "Bakery & Snacks": (0.20, 150, (2, 7), 0.25,
+                        ["Bread", "Buns", "Biscuits", "Roti", "Cake",
+                         "Fish Bun", "Chickpeas", "Burger"]),
+    "Pantry Staples": (0.18, 350, (90, 540), 0.6,
+                       ["Dhal", "Sugar", "Salt", "Noodles", "Coconut Oil",
+                        "Soya Meat", "Canned Fish", "Spices"]),
+    "Beverages": (0.12, 200, (30, 365), 0.3,
+                  ["Tea", "Coffee", "Juice", "Ginger Beer", "Soda",
+                   "King Coconut", "Malt Drink"]),
+    "Rice & Grains": (0.10, 400, (180, 365), 0.5,
+                      ["Samba Rice", "Basmati", "Red Rice", "Oats", "Flour",
+                       "Kurakkan"]),
+}
+ADJECTIVES = ["Fresh", "Organic", "Local", "Premium", "Family Pack", "Classic",
+              "Low Fat", "Whole", "Red", "Spicy", "Sweet", "Roasted", "Instant"]
+BASKET_SIZE = 8
+POPULARITY_EXPONENT = 1.1
+
+
+def generate_catalog(n_products, seed=0):
+    """{category: {name: product}} shaped like products.json."""
+    rng = np.random.default_rng(seed)
+    names = list(CATEGORIES)
+    shares = np.array([CATEGORIES[name][0] for name in names])
+    # Every category gets at least one product
+    counts = np.maximum(1, rng.multinomial(n_products, shares / shares.sum()))
+
+    data = {}
+    number = 0
+    for category, count in zip(names, counts):
+        _, median_price, (low, high), healthy_share, foods = CATEGORIES[category]
+        prices = np.round(median_price * rng.lognormal(0, 0.5, count), -1)
+        shelf_lives = rng.integers(low, high + 1, count)
+        healthy = rng.random(count) < healthy_share
+        adjectives = rng.choice(ADJECTIVES, count)
+        picks = rng.choice(foods, count)
+        products = {}
+        for i in range(count):
+            number += 1
+            products[f"{adjectives[i]} {picks[i]} #{number}"] = {
+                "price": int(max(10, prices[i])),
+                "days_to_expire": int(shelf_lives[i]),
+                "healthy": bool(healthy[i]),
+                "alt": None,
+                "category": category
+            }
+        data[category] = products
+
+    # Point unhealthy products at a healthy one from the same category
+    for products in data.values():
+        healthy_names = [name for name, p in products.items() if p['healthy']]
+        if healthy_names:
+            for product in products.values():
+                if not product['healthy']:
+                    product['alt'] = healthy_names[rng.integers(len(healthy_names))]
+    return data
+
+
+def generate_pantry(catalog_data, n_entries, today, years=2, seed=0):
+    """n_entries pantry entry dicts (with ids), bought over `years` up to
+    today, oldest first. Statuses are all "Good"; the expiry pass sets
+    the real ones."""
+    rng = np.random.default_rng(seed)
+    products = [(name, product) for products in catalog_data.values()
+                for name, product in products.items()]
+    if not products or not n_entries:
+        return []
+
+    # Popularity: a random ranking of the catalog, weighted 1 / rank^s
+    weights = 1 / np.arange(1, len(products) + 1) ** POPULARITY_EXPONENT
+    weights = weights[rng.permutation(len(products))]
+    picks = rng.choice(len(products), n_entries, p=weights / weights.sum())
+
+    # Shopping trips: weekends count double, recent days up to 3x more
+    span = int(365 * years)
+    offsets = np.arange(span)                  # days before today
+    days = [today - timedelta(days=int(offset)) for offset in offsets]
+    weekend = np.array([day.weekday() >= 5 for day in days])
+    day_weights = (1 + weekend) * (1 + 2 * (1 - offsets / span))
+    n_trips = max(1, n_entries // BASKET_SIZE)
+    trip_offsets = rng.choice(offsets, n_trips, p=day_weights / day_weights.sum())
+    buy_offsets = np.sort(trip_offsets[rng.integers(0, n_trips, n_entries)])[::-1]
+
+    shelf_lives = np.array([products[pick][1]['days_to_expire'] for pick in picks])
+    keep_days = np.maximum(1, np.round(shelf_lives * rng.uniform(0.8, 1.2, n_entries)))
+
+    base = datetime(today.year, today.month, today.day)
+    return [{
+        "id": entry_id,
+        "item": products[pick][0],
+        "buy_date": base - timedelta(days=int(offset)),
+        "expiry_date": base - timedelta(days=int(offset)) + timedelta(days=int(keep)),
+        "status": "Good"
+    } for entry_id, (pick, offset, keep)
+        in enumerate(zip(picks, buy_offsets, keep_days), start=1)]
+
+
+def write_dataset(out, n_products, n_entries, today, years=2, seed=0):
+    """Writes products.json and pantry_history.json into out; returns
+    (catalog data, pantry entries)."""
+    os.makedirs(out, exist_ok=True)
+    catalog_data = generate_catalog(n_products, seed)
+    entries = generate_pantry(catalog_data, n_entries, today, years, seed)
+    backend = JsonBackend(
+        catalog_file=os.path.join(out, "products.json"),
+        history_file=os.path.join(out, "pantry_history.json"),
+        journal_file=os.path.join(out, "pantry_history.jsonl"))
+    backend.save_catalog(catalog_data)
+    backend.save_history(entries)
+    return catalog_data, entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--years", type=float, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True, help="directory to write into")
+    args = parser.parse_args()
+
+    catalog_data, entries = write_dataset(args.out, args.products, args.entries,
+                                          datetime.now(), args.years, args.seed)
+    print(f"Wrote {sum(map(len, catalog_data.values()))} products and "
+          f"{len(entries)} pantry entries to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""Bulk product import with AI enrichment.
+
+Reads a supplier price list (CSV or JSONL with name, price and days /
+days_to_expire columns, plus an optional category) and adds every product
+to the catalog, asking the model for health ratings and alternatives:
+
+    python bulk_import.py suppliers.csv --workers 4 --rpm 60
+    python bulk_import.py suppliers.jsonl --stub      # offline stub model
+
+Products are sent in batches, with a bounded worker pool sharing one
+token-bucket rate limit. Model calls go through an LLMGateway at
+BACKGROUND priority (rate-limit backoff, metrics). Each finished batch
+is appended to a progress file, so an interrupted import resumes where
+it stopped. The catalog is written once, after every batch has been
+analysed. Products that already exist only have their price and shelf
+life updated.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from catalog import Catalog
+from llm import (BACKGROUND, LLMGateway, StubModel, TokenBucket,
+                 analyze_batch_prompt, parse_json_response)
+from storage import DataManager
+
+NAME_FIELDS = ("name", "product", "item")
+PRICE_FIELDS = ("price", "price_lkr")
+DAYS_FIELDS = ("days", "days_to_expire", "shelf_life")
+DEFAULT_CATEGORY = "Pantry Staples"
+
+
+def _field(row, names):
+    for name in names:
+        value = row.get(name)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def read_rows(path):
+    """Yields normalized {name, price, days, category} rows; skips and
+    reports rows without a name or with a non-numeric price/days."""
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            raw_rows = (json.loads(line) for line in f if line.strip())
+        else:
+            raw_rows = csv.DictReader(f)
+
+        for line_no, raw in enumerate(raw_rows, start=1):
+            row = {str(key).strip().lower(): value for key, value in raw.items()}
+            name = _field(row, NAME_FIELDS)
+            try:
+                price = float(_field(row, PRICE_FIELDS))
+                days = int(float(_field(row, DAYS_FIELDS)))
+            except (TypeError, ValueError):
+                print(f"⚠️ Skipping row {line_no}: missing price or days",
+                      file=sys.stderr)
+                continue
+            if not name:
+                print(f"⚠️ Skipping row {line_no}: missing name", file=sys.stderr)
+                continue
+            yield {
+                "name": str(name).strip(),
+                "price": int(price) if price.is_integer() else price,
+                "days": days,
+                "category": _field(row, ("category",))
+            }
+
+
+class ImportProgress:
+    """Append-only JSONL of {name: analysis} results, safe across threads."""
+
+    def __init__(self, path):
+        self.path = path
+        self.results = {}
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn last line from an interrupted run
+                    self.results[record['name']] = record['result']
+        except FileNotFoundError:
+            pass
+
+    def save(self, results):
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                for name, result in results.items():
+                    f.write(json.dumps({"name": name, "result": result}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.results.update(results)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class BulkImporter:
+    def __init__(self, model, catalog, progress, batch_size=10, workers=4,
+                 rpm=60, retries=3, shortlist_size=40):
+        # Calls are queued at BACKGROUND priority, so an importer given the
+        # app's gateway yields to interactive chat
+        if not isinstance(model, LLMGateway):
+            model = LLMGateway(model, workers=workers)
+        self.model = model
+        self.catalog = catalog
+        self.progress = progress
+        self.batch_size = batch_size
+        self.workers = workers
+        self.retries = retries
+        self.shortlist_size = shortlist_size
+        self.limiter = TokenBucket(rpm / 60, capacity=workers)
+        self.failed = []
+
+    def run(self, rows):
+        rows = list({row['name']: row for row in rows}.values())
+        pending = [row['name'] for row in rows
+                   if row['name'] not in self.catalog
+                   and row['name'] not in self.progress.results]
+        batches = [pending[i:i + self.batch_size]
+                   for i in range(0, len(pending), self.batch_size)]
+        print(f"{len(rows)} products, {len(pending)} to analyse in "
+              f"{len(batches)} batches", file=sys.stderr)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self._analyze, batch): batch
+                       for batch in batches}
+            for done, future in enumerate(as_completed(futures), start=1):
+                batch = futures[future]
+                try:
+                    self.progress.save(future.result())
+                except Exception as e:
+                    self.failed.extend(batch)
+                    print(f"❌ Batch failed ({batch[0]}...): {e}", file=sys.stderr)
+                print(f"  {done}/{len(batches)} batches", file=sys.stderr)
+
+        if self.failed:
+            return None
+        return self._apply(rows)
+
+    def _analyze(self, names):
+        products = list(dict.fromkeys(
+            match for name in names
+            for match in self.catalog.shortlist(name, self.shortlist_size // len(names) + 1)))
+        prompt = analyze_batch_prompt(names, products[:self.shortlist_size],
+                                      self.catalog.categories())
+        for attempt in range(self.retries):
+            self.limiter.acquire()
+            try:
+                answers = parse_json_response(self.model.generate_content(
+                    prompt, priority=BACKGROUND).text)
+                by_name = {answer.get('name'): answer for answer in answers}
+                if len(answers) != len(names):
+                    raise ValueError(f"expected {len(names)} answers, got {len(answers)}")
+                # Fall back to position if the model rewrote a name
+                return {name: by_name.get(name, answers[i])
+                        for i, name in enumerate(names)}
+            except Exception:
+                if attempt == self.retries - 1:
+                    raise
+                time.sleep(2 ** attempt)
+
+    def _apply(self, rows):
+        """Adds every analysed row to the catalog; returns how many changed."""
+        categories = set(self.catalog.categories())
+        changed = 0
+        for row in rows:
+            name = row['name']
+            existing = self.catalog.get(name)
+            if existing is not None:
+                existing.update(price=row['price'], days_to_expire=row['days'])
+                self.catalog.upsert(name, existing, existing['category'])
+                changed += 1
+                continue
+
+            result = self.progress.results.get(name) or {}
+            input_product = result.get('input_product') or {}
+            alt_name = result.get('alt_name')
+            category = (row['category'] or input_product.get('category')
+                        or DEFAULT_CATEGORY)
+
+            if result.get('alt_source') == "new" and alt_name and alt_name not in self.catalog:
+                details = result.get('new_product_details') or {}
+                alt_category = details.get('category')
+                if alt_category not in categories:
+                    alt_category = category
+                self.catalog.upsert(alt_name, {
+                    "price": details.get('price', 0),
+                    "days_to_expire": details.get('days_to_expire', 7),
+                    "healthy": True,
+                    "alt": None
+                }, alt_category)
+                changed += 1
+
+            self.catalog.upsert(name, {
+                "price": row['price'],
+                "days_to_expire": row['days'],
+                "healthy": input_product.get('healthy', False),
+                "alt": alt_name
+            }, category)
+            changed += 1
+        return changed
+
+
+def _gemini_model():
+    import google.generativeai as genai
+    genai.configure(api_key=os.environ.get("GEMINI_API_KEY", ""))
+    return genai.GenerativeModel('gemini-2.5-flash')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Import a CSV/JSONL price list into the product catalog.")
+    parser.add_argument("path")
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rpm", type=float, default=60,
+                        help="model requests per minute across all workers")
+    parser.add_argument("--progress",
+                        help="resume file (default: <path>.progress.jsonl)")
+    parser.add_argument("--stub", action="store_true",
+                        help="use the offline stub model instead of Gemini")
+    args = parser.parse_args(argv)
+
+    progress = ImportProgress(args.progress or args.path + ".progress.jsonl")
+    catalog = Catalog(DataManager.load_catalog())
+    importer = BulkImporter(StubModel() if args.stub else _gemini_model(),
+                            catalog, progress, batch_size=args.batch_size,
+                            workers=args.workers, rpm=args.rpm)
+
+    changed = importer.run(read_rows(args.path))
+    if changed is None:
+        print(f"{len(importer.failed)} products could not be analysed; "
+              f"re-run to retry them (progress kept in {progress.path}).",
+              file=sys.stderr)
+        return 1
+
+    DataManager.save_catalog(catalog.to_dict())
+    progress.clear()
+    print(f"✅ Imported {changed} catalog entries ({len(catalog)} products total).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+from collections import Counter
+from datetime import timedelta
+
+# ==========================================
+# 🛒 SHOPPING CART
+# ==========================================
+# The cart holds one line per product with a quantity, instead of one row
+# per click. Each line keeps the price and shelf life the product had when
+# it was first added, so totals and checkout never go back to the catalog.
+# The grand total and the per-category subtotals are adjusted on every
+# change rather than summed on every rerun.
+
+
+class ShoppingCart:
+    """Product name -> line ({item, category, price, days_to_expire, qty}).
+
+    `version` goes up on every change, for caches keyed on the cart.
+    """
+
+    def __init__(self):
+        self.lines = {}
+        self.total = 0
+        self.subtotals = {}
+        self.version = 0
+        self._units = Counter()  # category -> units, to drop empty subtotals
+
+    def __len__(self):
+        """Number of units in the cart."""
+        return sum(self._units.values())
+
+    def __bool__(self):
+        return bool(self.lines)
+
+    def __iter__(self):
+        return iter(self.lines.values())
+
+    def __contains__(self, name):
+        return name in self.lines
+
+    def quantity(self, name):
+        line = self.lines.get(name)
+        return line['qty'] if line else 0
+
+    def counts(self):
+        """{product: quantity}, in the order products were added."""
+        return {name: line['qty'] for name, line in self.lines.items()}
+
+    # --- Mutations ---
+
+    def add(self, name, details, qty=1):
+        """Adds qty units of a catalog product (its catalog dict)."""
+        line = self.lines.get(name)
+        if line is None:
+            line = self.lines[name] = {
+                "item": name,
+                "category": details['category'],
+                "price": details['price'],
+                "days_to_expire": details['days_to_expire'],
+                "qty": 0
+            }
+        self._adjust(line, qty)
+
+    def set_quantity(self, name, qty):
+        """Sets a line's quantity; 0 removes the line."""
+        line = self.lines.get(name)
+        if line is not None and qty != line['qty']:
+            self._adjust(line, max(0, qty) - line['qty'])
+
+    def remove(self, name):
+        self.set_quantity(name, 0)
+
+    def clear(self):
+        self.lines.clear()
+        self.total = 0
+        self.subtotals.clear()
+        self._units.clear()
+        self.version += 1
+
+    def _adjust(self, line, delta):
+        category = line['category']
+        amount = line['price'] * delta
+        line['qty'] += delta
+        self.total += amount
+        self.subtotals[category] = self.subtotals.get(category, 0) + amount
+        self._units[category] += delta
+        if line['qty'] <= 0:
+            del self.lines[line['item']]
+        if self._units[category] <= 0:
+            del self._units[category]
+            del self.subtotals[category]
+        self.version += 1
+
+    # --- Checkout ---
+
+    def pantry_entries(self, buy_date):
+        """New pantry entries for everything in the cart, qty per line."""
+        entries = []
+        for line in self.lines.values():
+            expiry_date = buy_date + timedelta(days=line['days_to_expire'])
+            entries.extend({
+                "item": line['item'],
+                "buy_date": buy_date,
+                "expiry_date": expiry_date,
+                "status": "Good"
+            } for _ in range(line['qty']))
+        return entries
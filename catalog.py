@@ -0,0 +1,245 @@
+import heapq
+import math
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from itertools import chain
+
+from storage import DataManager
+
+# ==========================================
+# 📚 PRODUCT CATALOG
+# ==========================================
+# The catalog is persisted as {category: {name: details}}. In memory it is
+# a flat name -> record map plus secondary indexes, so "items in category
+# X", "unhealthy items", price ranges and "which products point to this
+# alternative" are lookups instead of scans. A character n-gram index over
+# the names picks the products worth showing the model for a new item.
+
+
+def name_grams(name, n=3):
+    """Character n-gram counts of a padded, case-folded name."""
+    text = f" {' '.join(name.casefold().split())} "
+    return Counter(text[i:i + n] for i in range(len(text) - n + 1))
+
+
+class NameIndex:
+    """Inverted character-trigram index with TF-IDF cosine ranking.
+
+    Document frequencies are kept per gram, so adding or removing a name
+    only touches that name's postings; IDF is applied at query time.
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self._norms = {}
+
+    def __len__(self):
+        return len(self._norms)
+
+    def add(self, name):
+        if name in self._norms:
+            return
+        grams = name_grams(name)
+        for gram, tf in grams.items():
+            self._postings.setdefault(gram, {})[name] = tf
+        self._norms[name] = math.sqrt(sum(tf * tf for tf in grams.values()))
+
+    def remove(self, name):
+        if self._norms.pop(name, None) is None:
+            return
+        for gram in name_grams(name):
+            postings = self._postings[gram]
+            del postings[name]
+            if not postings:
+                del self._postings[gram]
+
+    def search(self, query, k):
+        """Up to k (score, name) pairs, most similar first."""
+        n_docs = len(self._norms)
+        scores = {}
+        for gram, q_tf in name_grams(query).items():
+            postings = self._postings.get(gram)
+            if not postings:
+                continue
+            idf = math.log((n_docs + 1) / (len(postings) + 1)) + 1
+            weight = q_tf * idf * idf
+            for name, tf in postings.items():
+                scores[name] = scores.get(name, 0.0) + weight * tf
+        return heapq.nlargest(k, ((score / self._norms[name], name)
+                                  for name, score in scores.items()))
+
+
+class Catalog:
+    """Indexed product catalog.
+
+    Records are private copies of the loaded data: get() hands out copies
+    and to_dict() builds a fresh nested structure for save_catalog(), so
+    nothing outside the catalog can mutate it behind its indexes' back.
+    """
+
+    def __init__(self, catalog_data=None):
+        self._products = {}
+        # Dicts used as ordered sets, to keep the persisted display order
+        self._by_category = {}
+        self._by_health = {True: {}, False: {}}
+        self._by_price = []
+        self._alt_of = {}
+        self._names = NameIndex()
+        self._lock = threading.Lock()
+
+        for cat, items in (catalog_data or {}).items():
+            self.add_category(cat)
+            for name, details in items.items():
+                self.upsert(name, details, cat)
+
+    # --- Lookups ---
+
+    def __contains__(self, name):
+        return name in self._products
+
+    def __len__(self):
+        return len(self._products)
+
+    def __bool__(self):
+        return bool(self._by_category)
+
+    def get(self, name, default=None):
+        """Product details including its 'category', or default."""
+        record = self._products.get(name)
+        return dict(record) if record is not None else default
+
+    def names(self):
+        return list(self._products)
+
+    def categories(self):
+        return list(self._by_category)
+
+    def items_in(self, category):
+        return list(self._by_category.get(category, ()))
+
+    def healthy_items(self):
+        return list(self._by_health[True])
+
+    def unhealthy_items(self):
+        return list(self._by_health[False])
+
+    def in_price_range(self, low, high):
+        """Names priced between low and high (inclusive), cheapest first."""
+        start = bisect_left(self._by_price, low, key=lambda pair: pair[0])
+        end = bisect_right(self._by_price, high, key=lambda pair: pair[0])
+        return [name for _, name in self._by_price[start:end]]
+
+    def referencing(self, alt_name):
+        """Unhealthy products that suggest alt_name as their alternative."""
+        return list(self._alt_of.get(alt_name, ()))
+
+    def shortlist(self, name, k=40):
+        """Up to k product names worth offering as alternatives to name.
+
+        The closest names come first; the remaining slots go to healthy
+        products from the categories those names belong to (then to any
+        healthy product), so a new "Chicken Burger" is shown the nearby
+        burgers and the healthy items next to them, not the whole catalog.
+        """
+        with self._lock:
+            if len(self._products) <= k:
+                return list(self._products)
+            picked = {match: None
+                      for _, match in self._names.search(name, k // 2)}
+            related = [other
+                       for cat in dict.fromkeys(self._products[match]['category']
+                                                for match in picked)
+                       for other in self._by_category[cat]
+                       if self._products[other]['healthy']]
+            for other in chain(related, self._by_health[True]):
+                if len(picked) >= k:
+                    break
+                picked.setdefault(other)
+            return list(picked)
+
+    # --- Edits ---
+
+    def add_category(self, category):
+        with self._lock:
+            self._by_category.setdefault(category, {})
+
+    def upsert(self, name, details, category):
+        """Adds a product, or edits it (moving it if category changed)."""
+        record = {key: value for key, value in details.items()
+                  if key != 'category'}
+        record['category'] = category
+        record['healthy'] = bool(record.get('healthy', False))
+        record.setdefault('alt', None)
+
+        with self._lock:
+            old = self._products.get(name)
+            if old is not None:
+                self._unindex(name, old, keep_category=old['category'] == category)
+            self._products[name] = record
+            self._names.add(name)
+            self._by_category.setdefault(category, {})[name] = None
+            self._by_health[record['healthy']][name] = None
+            insort(self._by_price, (record['price'], name))
+            if not record['healthy'] and record['alt']:
+                self._alt_of.setdefault(record['alt'], {})[name] = None
+
+    def remove(self, name):
+        with self._lock:
+            record = self._products.pop(name, None)
+            if record is not None:
+                self._unindex(name, record, keep_category=False)
+                self._names.remove(name)
+
+    def to_dict(self):
+        """Fresh {category: {name: details}} structure for persistence."""
+        return {cat: {name: {key: value
+                             for key, value in self._products[name].items()
+                             if key != 'category'}
+                      for name in names}
+                for cat, names in self._by_category.items()}
+
+    def _unindex(self, name, record, keep_category):
+        if not keep_category:
+            self._by_category[record['category']].pop(name, None)
+        self._by_health[record['healthy']].pop(name, None)
+        position = bisect_left(self._by_price, (record['price'], name))
+        del self._by_price[position]
+        referrers = self._alt_of.get(record['alt'])
+        if referrers is not None:
+            referrers.pop(name, None)
+            if not referrers:
+                del self._alt_of[record['alt']]
+
+
+class CatalogCache:
+    """Parsed and indexed catalog, shared by every session in the process.
+
+    Streamlit re-runs app.py on every interaction; the cache only reloads
+    when the backend, DataManager.catalog_version or the backend's
+    catalog_signature() changes.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._key = None
+        self._value = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        backend = DataManager.backend
+        key = (id(backend), DataManager.catalog_version,
+               backend.catalog_signature())
+        with self._lock:
+            if key == self._key:
+                self.hits += 1
+                return self._value
+
+            self.misses += 1
+            self._value = Catalog(backend.load_catalog())
+            self._key = key
+            return self._value
+
+
+catalog_cache = CatalogCache()
@@ -0,0 +1,308 @@
+import re
+from collections import namedtuple
+
+# ==========================================
+# 🧭 LOCAL CHAT COMMANDS
+# ==========================================
+# Commands with a fixed shape ("Add Pizza", "Remove milk", "What's
+# expiring?") are recognised here and answered from the agent's own state.
+# Everything else is escalated to the model.
+
+# item: the name to act on. names: for "stock", every pantry item it
+# covers. known: whether item is an existing catalog/pantry name.
+Intent = namedtuple("Intent", ["action", "item", "known", "names"],
+                    defaults=(None, False, ()))
+
+_FILLER = r"(?:(?:a|an|the|my|some|one|new)\s+)*"
+_END = r"[\s.!?]*$"
+_VAGUE = re.compile(r"^(?:something|anything|more|stuff|things?)\b", re.IGNORECASE)
+_PATTERNS = [
+    # "Save X" / "Create X" only for exact catalog names ("Save money",
+    # "Create a meal plan" are requests); "Add X" also for new products
+    ("add", re.compile(
+        r"^(?:please\s+)?(?P<verb>add|save|create)\s+" + _FILLER +
+        r"(?P<item>.+?)(?:\s+to\s+(?:the\s+|my\s+)?(?:database|db|catalog|products))?"
+        + _END, re.IGNORECASE)),
+    ("remove", re.compile(
+        r"^(?:please\s+)?(?:remove|delete|discard|throw\s+(?:out|away)|"
+        r"i\s+(?:used\s+up|finished|ate))\s+" + _FILLER +
+        r"(?P<item>.+?)(?:\s+from\s+(?:the\s+|my\s+)?pantry)?" + _END,
+        re.IGNORECASE)),
+    ("stock", re.compile(
+        r"^do\s+i\s+(?:still\s+)?have\s+(?:any\s+)?" + _FILLER +
+        r"(?P<item>.+?)(?:\s+(?:left|in\s+stock|in\s+(?:the\s+|my\s+)?pantry))?"
+        + _END, re.IGNORECASE)),
+    ("stock", re.compile(
+        r"^how\s+(?:many|much)\s+" + _FILLER + r"(?P<item>.+?)\s+"
+        r"(?:do\s+i\s+have|are\s+left|is\s+left|left|in\s+stock)" + _END,
+        re.IGNORECASE)),
+    # Short questions only ("What's expiring?", "Anything going bad soon?",
+    # "Show expiring items"); "What can I cook with what's expiring?" is
+    # left to the model
+    ("expiring", re.compile(
+        r"^(?:(?:what|which)(?:\s+(?:items?|foods?|things?|products?))?"
+        r"(?:'s|\s+is|\s+are|\s+will\s+be)?|(?:is\s+)?(?:there\s+)?anything"
+        r"|show(?:\s+me)?(?:\s+the)?|list(?:\s+the)?)\s+"
+        r"(?:expir\w*|going\s+(?:bad|off))"
+        r"(?:\s+(?:items?|foods?|things?|products?|stuff))?"
+        r"(?:\s+(?:soon|today|tomorrow|this\s+week|next|"
+        r"in\s+(?:the\s+|my\s+)?(?:pantry|fridge)))*" + _END, re.IGNORECASE)),
+]
+# A captured "item" with these in it is a sentence ("milk to my shopping
+# list", "bread please"), not a product name
+_TAIL = re.compile(r"\s+to\s+\S|\bplease\b", re.IGNORECASE)
+
+
+def _aliases(name):
+    """Lookup forms of a catalog name: "Red Dhal (Parippu)" is also
+    "red dhal" and "parippu"."""
+    key = name.casefold()
+    yield key
+    base, _, rest = key.partition("(")
+    if rest:
+        yield base.strip()
+        yield rest.rstrip(")").strip()
+
+
+def exact_name(name, candidates):
+    """The candidate equal to name ignoring case, or None."""
+    key = name.casefold()
+    return next((c for c in candidates if c.casefold() == key), None)
+
+
+def alias_matches(name, candidates):
+    """Candidates that name is the full name or an alias of."""
+    key = name.casefold()
+    return {c for c in candidates if key in _aliases(c)}
+
+
+def word_matches(name, candidates):
+    """Candidates containing name as whole words ("milk" -> "Highland
+    Milk Packet")."""
+    word = re.compile(r"\b" + re.escape(name.casefold()) + r"\b")
+    return [c for c in candidates if word.search(c.casefold())]
+
+
+class IntentRouter:
+    """Maps a chat message to an Intent, or None to ask the model.
+
+    Names are only matched where a wrong guess is harmless:
+    - add: known only for an exact catalog name, else the literal name
+      (the add flow then creates a product instead of overwriting one);
+    - remove: an exact pantry name, or an alias no other item shares,
+      else the model;
+    - stock: every pantry item containing the name, else the model.
+    Counts routed and escalated messages.
+    """
+
+    def __init__(self):
+        self.local = 0
+        self.escalated = 0
+
+    def route(self, text, catalog_names=(), pantry_names=()):
+        intent = self._route(" ".join(text.split()), catalog_names, pantry_names)
+        if intent is None:
+            self.escalated += 1
+        else:
+            self.local += 1
+        return intent
+
+    @staticmethod
+    def _route(text, catalog_names, pantry_names):
+        for action, pattern in _PATTERNS:
+            match = pattern.match(text)
+            if not match:
+                continue
+            if "item" not in pattern.groupindex:
+                return Intent(action, None, False)
+
+            raw = match.group("item").strip(" '\"")
+            if not raw or len(raw.split()) > 5 or _VAGUE.match(raw):
+                # Probably a request or a sentence, not a product name
+                return None
+            if action == "add":
+                item = exact_name(raw, catalog_names)
+                if item is not None:
+                    return Intent(action, item, True)
+                if match.group("verb").lower() != "add" or _TAIL.search(raw):
+                    return None
+                return Intent(action, raw.title() if raw.islower() else raw)
+
+            if action == "remove":
+                item = exact_name(raw, pantry_names)
+                if item is None:
+                    # An alias only counts if no other pantry item has the
+                    # word: "chicken" is also in "Chicken Burger"
+                    aliases = alias_matches(raw, pantry_names)
+                    if len(aliases) != 1 or len(word_matches(raw, pantry_names)) != 1:
+                        return None
+                    item = aliases.pop()
+                return Intent(action, item, True)
+
+            names = word_matches(raw, pantry_names)
+            if not names:
+                return None
+            item = names[0] if len(names) == 1 else (
+                raw.title() if raw.islower() else raw)
+            return Intent(action, item, True, tuple(names))
+        return None
+
+
+chat_router = IntentRouter()
+
+
+# ==========================================
+# 💬 MULTI-TURN CHAT SESSION
+# ==========================================
+# The model is stateless, so every request carries the conversation. The
+# system prompt and a full context snapshot go out once, at the top of the
+# conversation, and stay byte-identical afterwards (which also lets the API
+# reuse its cache for that prefix). Later turns only carry the context
+# lines that changed since the previous turn. Once the conversation grows
+# past max_messages, older turns are folded into a short summary and the
+# conversation restarts from a fresh snapshot.
+
+SYSTEM_PROMPT = """You are a smart grocery assistant.
+
+COMMAND RULE:
+If user wants to ADD a new item (e.g. "Add Pizza", "Save Apples"), return ONLY JSON:
+{"action": "start_add", "item": "Pizza"}
+
+Otherwise, answer normally as a friendly assistant.
+"""
+
+
+def context_delta(old, new):
+    """Lines added to / removed from a context string, or None if equal."""
+    old_lines = set(old.splitlines())
+    new_lines = set(new.splitlines())
+    added = [line for line in new.splitlines() if line not in old_lines]
+    removed = [line for line in old.splitlines() if line not in new_lines]
+    if not added and not removed:
+        return None
+    return "\n".join([f"+ {line}" for line in added] +
+                     [f"- {line}" for line in removed])
+
+
+class ChatSession:
+    """One user's conversation with the model, as sent to generate_content."""
+
+    def __init__(self, max_messages=24, summary_chars=1200):
+        self.max_messages = max_messages
+        self.summary_chars = summary_chars
+        self.contents = []
+        self.summary = ""
+        self._context = None
+        self._previous_context = None
+
+    def next_message(self, user_text, context):
+        """Adds the user turn for user_text and returns the contents to send."""
+        if len(self.contents) >= self.max_messages:
+            self._fold()
+
+        if not self.contents:
+            parts = [SYSTEM_PROMPT, f"Context:\n{context}"]
+            if self.summary:
+                parts.append(f"Summary of our earlier conversation:\n{self.summary}")
+            parts.append(f"User: {user_text}")
+            text = "\n".join(parts)
+        else:
+            delta = context_delta(self._context, context)
+            if delta is None:
+                text = f"User: {user_text}"
+            elif len(delta) < len(context):
+                text = f"Context changes since my last message:\n{delta}\n\nUser: {user_text}"
+            else:
+                text = f"Updated context:\n{context}\n\nUser: {user_text}"
+
+        self._previous_context, self._context = self._context, context
+        self.contents.append({"role": "user", "parts": [text]})
+        return list(self.contents)
+
+    def record_reply(self, reply_text):
+        self.contents.append({"role": "model", "parts": [reply_text]})
+
+    def note_exchange(self, user_text, reply_text, context):
+        """Records a turn that was answered locally, for follow-ups."""
+        self.next_message(user_text, context)
+        self.record_reply(reply_text)
+
+    def discard_turn(self):
+        """Drops a user turn whose reply failed, and the context it carried,
+        so the next turn's delta is against what the model last saw."""
+        if self.contents and self.contents[-1]["role"] == "user":
+            self.contents.pop()
+            self._context = self._previous_context
+
+    def _fold(self):
+        """Summarizes the conversation so far and starts a fresh one."""
+        lines = []
+        for message in self.contents:
+            text = message["parts"][0]
+            if message["role"] == "user":
+                # Only the user's words, not the context that came with them
+                text = text.rpartition("User: ")[2]
+            lines.append(summary_line(message["role"], text))
+        self.summary = extend_summary(self.summary, lines, self.summary_chars)
+        self.contents = []
+
+
+def summary_line(role, text, width=150):
+    who = "User" if role == "user" else "Assistant"
+    text = " ".join(text.split())
+    return f"{who}: {text[:width]}{'…' if len(text) > width else ''}"
+
+
+def extend_summary(summary, lines, max_chars):
+    """Appends lines to a summary, dropping its oldest lines past max_chars."""
+    summary = "\n".join(([summary] if summary else []) + lines)
+    if len(summary) > max_chars:
+        summary = summary[-max_chars:].partition("\n")[2]
+    return summary
+
+
+class ChatHistory:
+    """Messages shown in the chat dialog, with bounded memory.
+
+    The newest max_messages messages are kept verbatim; older ones are
+    folded, a chunk at a time, into a capped text summary. window(n)
+    hands the dialog only the messages it renders, so a rerun costs the
+    same however long the conversation has run.
+    """
+
+    # Messages rendered at first, and added per "Load earlier" click
+    PAGE = 30
+
+    def __init__(self, max_messages=200, summary_chars=4000):
+        self.max_messages = max_messages
+        self.summary_chars = summary_chars
+        self.summary = ""
+        self.archived = 0
+        self._messages = []
+
+    def __len__(self):
+        return self.archived + len(self._messages)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def append(self, message):
+        self._messages.append(message)
+        if len(self._messages) > self.max_messages:
+            # Fold a quarter at once so appends stay amortized O(1)
+            cut = max(1, self.max_messages // 4)
+            old, self._messages = self._messages[:cut], self._messages[cut:]
+            self.summary = extend_summary(
+                self.summary,
+                [summary_line(m["role"], m["content"]) for m in old],
+                self.summary_chars)
+            self.archived += len(old)
+
+    def window(self, n):
+        """The last n verbatim messages, oldest first."""
+        return self._messages[-n:] if n > 0 else []
+
+    @property
+    def available(self):
+        """How many messages window() can return."""
+        return len(self._messages)
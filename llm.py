@@ -0,0 +1,738 @@
+import ast
+import hashlib
+import itertools
+import json
+import logging
+import queue
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from types import SimpleNamespace
+
+from metrics import registry as metrics
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# 🧠 GEMINI HELPERS
+# ==========================================
+
+
+def normalize_text(text):
+    """Case- and whitespace-insensitive form of a prompt fragment."""
+    return " ".join(str(text).split()).casefold()
+
+
+def fingerprint(values):
+    """Short, order-independent digest of a list of names."""
+    digest = hashlib.sha1()
+    for value in sorted(normalize_text(v) for v in values):
+        digest.update(value.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def parse_json_response(text):
+    cleaned = text.replace("```json", "").replace("```", "").strip()
+    return json.loads(cleaned)
+
+
+def analyze_product_prompt(name, products, categories):
+    """Prompt asking for a new product's health rating and alternative.
+
+    products should be a shortlist (Catalog.shortlist) rather than the
+    whole catalog, which keeps the prompt size independent of it.
+    """
+    return f"""
+    I am adding a new product: "{name}".
+    
+    Current Database items (closest matches): {products}
+    Existing Categories: {categories}
+    
+    Task:
+    1. Is "{name}" healthy? (true/false)
+    2. Find the BEST alternative.
+       - First, look in the Current Database.
+       - IF NO GOOD MATCH EXISTS: Invent a new, realistic healthy alternative available in Sri Lanka.
+       - Example: If input is "Chicken Burger", substitute could be "Grilled Chicken Salad".
+    
+    3. If you INVENT a new alternative, estimate its details.
+       - CRITICAL: For "category", you MUST pick one from the 'Existing Categories' list provided above. 
+         Only invent a new category if the item absolutely cannot fit into any existing one (e.g., trying to put 'Chicken' into 'Beverages').
+    
+    Return JSON ONLY:
+    {{
+        "input_product": {{
+            "healthy": true/false,
+            "price": 100,
+            "days_to_expire": 3,
+            "category": "Exact Category Name"
+        }},
+        "alt_name": "Name of alternative" or null,
+        "alt_source": "existing" or "new",
+        "new_product_details": {{ 
+            "price": 100, 
+            "days_to_expire": 7, 
+            "category": "Exact Category Name"
+        }}
+    }}
+    """
+
+
+def analyze_batch_prompt(names, products, categories):
+    """analyze_product_prompt for several products in one request."""
+    return f"""
+    I am adding these new products: {json.dumps(names)}
+
+    Current Database items (closest matches): {products}
+    Existing Categories: {categories}
+
+    For EACH new product:
+    1. Is it healthy? (true/false)
+    2. Find the BEST alternative.
+       - First, look in the Current Database.
+       - IF NO GOOD MATCH EXISTS: Invent a new, realistic healthy alternative available in Sri Lanka.
+    3. If you INVENT a new alternative, estimate its details.
+       - CRITICAL: For "category", you MUST pick one from the 'Existing Categories' list provided above.
+
+    Return JSON ONLY: a list with one object per new product, in the same order:
+    [
+        {{
+            "name": "The new product, exactly as given",
+            "input_product": {{ "healthy": true/false, "category": "Exact Category Name" }},
+            "alt_name": "Name of alternative" or null,
+            "alt_source": "existing" or "new",
+            "new_product_details": {{ "price": 100, "days_to_expire": 7, "category": "Exact Category Name" }}
+        }}
+    ]
+    """
+
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    """Rough token count; Gemini averages about 4 characters per token."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def pantry_context(overview, current_date, cart_items, max_tokens=400):
+    """Chat context from PantryStore.item_overview() rows, within max_tokens.
+
+    Items are listed most urgent first, one line each; items that only
+    have expired entries share a single line at the end. Whatever does not
+    fit the budget is summarized as a count. cart_items is a list of
+    product names or a {name: quantity} map.
+    """
+    cart = Counter(cart_items)
+    cart_text = ", ".join(f"{item} x{count}" if count > 1 else item
+                          for item, count in cart.items()) or "Empty"
+    header = f"Current Date: {current_date.strftime('%Y-%m-%d')}\n"
+    footer = f"My Shopping List: {cart_text}\n"
+    if not overview:
+        return header + "My Pantry Inventory: Empty\n" + footer
+
+    lines = []
+    expired = []
+    for name, counts, next_expiry, _ in overview:
+        if next_expiry is None:
+            n = counts.get("Expired", 0)
+            expired.append(f"{name} x{n}" if n > 1 else name)
+            continue
+        detail = ", ".join(f"{count} {status}" for status, count in counts.items()
+                           if status != "Expired")
+        if counts.get("Expired"):
+            detail += f" (+{counts['Expired']} expired)"
+        lines.append(f"- {name}: {detail}, "
+                     f"next expiry {next_expiry.strftime('%Y-%m-%d')}")
+    if expired:
+        more = f" and {len(expired) - 20} more" if len(expired) > 20 else ""
+        lines.append(f"- Expired, to discard: {', '.join(expired[:20])}{more}")
+
+    title = f"My Pantry Inventory ({len(overview)} items, most urgent first):\n"
+    budget = max_tokens * CHARS_PER_TOKEN - len(header) - len(title) - len(footer)
+    kept = []
+    for i, line in enumerate(lines):
+        rest = len(lines) - i - 1
+        reserve = 40 if rest else 0  # room for the "...and N more" line
+        if len(line) + 1 + reserve > budget:
+            kept.append(f"- ...and {len(lines) - i} more (not shown)")
+            break
+        kept.append(line)
+        budget -= len(line) + 1
+    return header + title + "\n".join(kept) + "\n" + footer
+
+
+class StreamedReply:
+    """Iterates the text chunks of a streamed generate_content call.
+
+    Accumulates the full reply in .text and records time to first token
+    and total latency (in seconds), which are logged once it completes.
+    """
+
+    def __init__(self, model, prompt):
+        self.model = model
+        self.prompt = prompt
+        self.text = ""
+        self.ttft = None
+        self.total = None
+
+    def __iter__(self):
+        started = time.perf_counter()
+        for chunk in self.model.generate_content(self.prompt, stream=True):
+            try:
+                piece = chunk.text
+            except ValueError:
+                continue  # chunk without text parts (e.g. a finish marker)
+            if self.ttft is None:
+                self.ttft = time.perf_counter() - started
+            self.text += piece
+            yield piece
+        self.total = time.perf_counter() - started
+        metrics.observe("chat_ttft", self.ttft or self.total)
+        metrics.observe("chat_reply", self.total)
+        logger.info("chat reply: ttft=%.3fs total=%.3fs input_tokens~%d chars=%d",
+                    self.ttft or self.total, self.total, self.input_tokens,
+                    len(self.text))
+
+    @property
+    def input_tokens(self):
+        """Estimated size of the request (a prompt or multi-turn contents)."""
+        if isinstance(self.prompt, str):
+            return estimate_tokens(self.prompt)
+        return sum(estimate_tokens(part) for message in self.prompt
+                   for part in message["parts"])
+
+    @property
+    def maybe_json(self):
+        """True while the reply could still be a JSON command, which
+        should not be shown to the user as it streams in."""
+        return self.text.lstrip().startswith(("{", "`"))
+
+
+class TokenBucket:
+    """Blocking rate limiter: `rate` tokens per second, bursts of `capacity`."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity,
+                                   self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class RateLimited(Exception):
+    """A model call was rejected by the quota (HTTP 429)."""
+
+
+class GatewayBusy(Exception):
+    """The gateway queue is full; try again later."""
+
+
+def is_rate_limit(error):
+    # google.api_core raises ResourceExhausted / TooManyRequests for 429s;
+    # matching by name avoids importing it here
+    return (isinstance(error, RateLimited)
+            or type(error).__name__ in ("ResourceExhausted", "TooManyRequests")
+            or "429" in str(error))
+
+
+INTERACTIVE, BACKGROUND = 0, 1
+_DONE = object()
+
+
+class _Job:
+    def __init__(self, prompt, stream, key=None):
+        self.prompt = prompt
+        self.stream = stream
+        self.key = key
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.chunks = queue.Queue() if stream else None
+
+
+class GatewayMetrics:
+    """Counters and recent latencies for calls made through a gateway."""
+
+    def __init__(self, window=500):
+        self.calls = 0
+        self.coalesced = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.errors = 0
+        self.rejected = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def count(self, name, n=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def record_call(self, latency, input_tokens, output_tokens):
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+            self.latencies.append(latency)
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            stats = {name: getattr(self, name) for name in (
+                "calls", "coalesced", "retries", "rate_limited", "errors",
+                "rejected", "input_tokens", "output_tokens")}
+        stats["p50_s"] = latencies[len(latencies) // 2] if latencies else 0.0
+        stats["p95_s"] = latencies[int(len(latencies) * 0.95)] if latencies else 0.0
+        return stats
+
+
+def _usage(response, attribute, fallback):
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, attribute, None) or fallback
+
+
+class LLMGateway:
+    """Shared front door to a model, with the model's generate_content API.
+
+    - Identical non-streaming prompts that are already in flight share
+      one call (single flight).
+    - Calls wait in a bounded priority queue served by `workers` threads;
+      INTERACTIVE work is taken before BACKGROUND work. A full queue
+      raises GatewayBusy instead of piling up.
+    - Rate-limit errors are retried with full-jitter exponential backoff,
+      and every worker pauses for the backoff period, so a burst backs
+      off as a whole instead of hammering the quota.
+    - Latency and token counts are kept in .metrics.
+    """
+
+    def __init__(self, model, workers=4, max_queue=64, max_retries=5,
+                 base_delay=1.0, max_delay=30.0):
+        self.model = model
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.metrics = GatewayMetrics()
+        self._queue = queue.PriorityQueue(maxsize=max_queue)
+        self._inflight = {}
+        self._order = itertools.count()
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+        for _ in range(workers):
+            threading.Thread(target=self._work, daemon=True).start()
+
+    def generate_content(self, prompt, stream=False, priority=INTERACTIVE,
+                         timeout=None):
+        if stream:
+            job = _Job(prompt, stream=True)
+            self._enqueue(job, priority)
+            return self._iter_chunks(job, timeout)
+
+        with metrics.span("generate_content"):
+            return self._call(prompt, priority, timeout)
+
+    def _call(self, prompt, priority, timeout):
+        key = ResponseCache.make_key(prompt)
+        with self._lock:
+            job = self._inflight.get(key)
+            if job is None:
+                job = _Job(prompt, stream=False, key=key)
+                self._enqueue(job, priority)
+                self._inflight[key] = job
+            else:
+                self.metrics.count("coalesced")
+        if not job.done.wait(timeout):
+            raise TimeoutError("model call timed out")
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def _enqueue(self, job, priority):
+        try:
+            self._queue.put_nowait((priority, next(self._order), job))
+        except queue.Full:
+            self.metrics.count("rejected")
+            raise GatewayBusy("too many AI requests queued") from None
+
+    @staticmethod
+    def _iter_chunks(job, timeout):
+        while True:
+            item = job.chunks.get(timeout=timeout)
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def _work(self):
+        while True:
+            _, _, job = self._queue.get()
+            try:
+                self._run(job)
+            except Exception as e:
+                job.error = e
+            finally:
+                if job.key is not None:
+                    with self._lock:
+                        self._inflight.pop(job.key, None)
+                if job.stream:
+                    job.chunks.put(job.error if job.error is not None else _DONE)
+                job.done.set()
+
+    def _run(self, job):
+        input_tokens = estimate_tokens(job.prompt if isinstance(job.prompt, str)
+                                       else json.dumps(job.prompt))
+        for attempt in range(self.max_retries + 1):
+            pause = self._resume_at - time.monotonic()
+            if pause > 0:
+                time.sleep(pause)
+
+            started = time.perf_counter()
+            delivered = 0
+            try:
+                if job.stream:
+                    text = ""
+                    last = None
+                    for chunk in self.model.generate_content(job.prompt, stream=True):
+                        job.chunks.put(chunk)
+                        delivered += 1
+                        last = chunk
+                        try:
+                            text += chunk.text
+                        except ValueError:
+                            pass
+                    response, output_text = last, text
+                else:
+                    response = job.result = self.model.generate_content(job.prompt)
+                    output_text = response.text
+            except Exception as e:
+                # A half-delivered stream cannot be replayed
+                if not is_rate_limit(e) or attempt == self.max_retries or delivered:
+                    self.metrics.count("errors")
+                    raise
+                self.metrics.count("rate_limited")
+                self.metrics.count("retries")
+                delay = random.uniform(0, min(self.max_delay,
+                                              self.base_delay * 2 ** attempt))
+                with self._lock:
+                    self._resume_at = max(self._resume_at, time.monotonic() + delay)
+                continue
+
+            latency = time.perf_counter() - started
+            usage = (_usage(response, "prompt_token_count", input_tokens),
+                     _usage(response, "candidates_token_count",
+                            estimate_tokens(output_text)))
+            self.metrics.record_call(latency, *usage)
+            kind = "stream" if job.stream else "call"
+            metrics.observe("model_call", latency, kind=kind)
+            metrics.inc("llm_input_tokens", usage[0], kind=kind)
+            metrics.inc("llm_output_tokens", usage[1], kind=kind)
+            return
+
+
+class LazyModel:
+    """A model built by factory() on its first generate_content call.
+
+    Lets the app set up its gateway without importing the model SDK,
+    which is only loaded once something actually asks the model.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._model is not None
+
+    def generate_content(self, *args, **kwargs):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._factory()
+        return self._model.generate_content(*args, **kwargs)
+
+
+class StubModel:
+    """Offline stand-in for the Gemini model, for tests and dry runs.
+
+    Understands the product-analysis prompts above: names containing a
+    junk-food keyword are unhealthy and get an invented "Healthy <name>"
+    alternative in the first listed category.
+    """
+
+    UNHEALTHY = ("burger", "fried", "chips", "soda", "cola", "chocolate",
+                 "noodles", "sausage", "cake", "candy", "biscuit", "sugar")
+
+    def __init__(self, delay=0.0, rate_limit_every=0):
+        self.delay = delay
+        # Fail every Nth call with RateLimited, like a quota-limited API
+        self.rate_limit_every = rate_limit_every
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, stream=False):
+        with self._lock:
+            self.calls += 1
+            calls = self.calls
+        if self.rate_limit_every and calls % self.rate_limit_every == 0:
+            raise RateLimited("429 Resource has been exhausted (stub)")
+        if self.delay:
+            time.sleep(self.delay)
+        text = self._reply(prompt)
+        if stream:
+            # Word-sized chunks, like a streamed response
+            return [SimpleNamespace(text=piece)
+                    for piece in re.findall(r"\S*\s*", text) if piece]
+        return SimpleNamespace(text=text)
+
+    def _reply(self, prompt):
+        if not isinstance(prompt, str):
+            # Multi-turn contents: answer the latest user message
+            prompt = prompt[-1]["parts"][0]
+        batch = re.search(r"new products: (\[.*\])", prompt)
+        single = re.search(r'new product: "(.*)"\.', prompt)
+        cats = re.search(r"Existing Categories: (\[.*\])", prompt)
+        categories = ast.literal_eval(cats.group(1)) if cats else []
+        category = categories[0] if categories else "Pantry Staples"
+
+        if batch:
+            return json.dumps([self._analyze(name, category)
+                               for name in json.loads(batch.group(1))])
+        if single:
+            return json.dumps(self._analyze(single.group(1), category))
+        return "I'm a stub model and can only analyze products."
+
+    def _analyze(self, name, category):
+        healthy = not any(word in name.lower() for word in self.UNHEALTHY)
+        result = {
+            "name": name,
+            "input_product": {"healthy": healthy, "price": 0,
+                              "days_to_expire": 0, "category": category},
+            "alt_name": None,
+            "alt_source": "existing"
+        }
+        if not healthy:
+            result.update(alt_name=f"Healthy {name}", alt_source="new",
+                          new_product_details={"price": 500, "days_to_expire": 7,
+                                               "category": category})
+        return result
+
+
+# ==========================================
+# 🔢 LOCAL PRICE / SHELF-LIFE PARSER
+# ==========================================
+# Handles the replies the add flow asks for ("500 3", "1500 LKR, 2 days",
+# "Rs. 1,200 for 2 weeks") without a model round trip. Numbers are labelled
+# by a currency marker or a day/week/month unit next to them; unlabelled
+# numbers fill whatever is still missing in "price then days" order.
+
+_NUMBER = re.compile(r"\d+(?:,\d{3})*(?:\.\d+)?")
+_PRICE_BEFORE = re.compile(
+    r"(?:lkr|rs\.?|රු\.?|\$|price|cost|costs)\s*[:=]?\s*$")
+_PRICE_AFTER = re.compile(r"^\s*(?:/-|lkr\b|rs\b|rupees?\b)")
+_DAYS_BEFORE = re.compile(
+    r"(?:(?<!\d)(?<!\d\s)days?|shelf\s*life|expires?\s*in|lasts?(?:\s*for)?)"
+    r"\s*[:=]?\s*$")
+_UNIT_AFTER = re.compile(r"^\s*-?\s*(days?\b|d\b|weeks?\b|wks?\b|months?\b)")
+UNIT_DAYS = {"d": 1, "w": 7, "m": 30}
+
+
+class DetailParser:
+    """Extracts {"price", "days"} locally, or returns None to defer to the
+    model. Counts how many inputs took each path."""
+
+    def __init__(self):
+        self.fast_path = 0
+        self.fallback = 0
+
+    def parse(self, text):
+        details = self._parse(text.lower())
+        if details is None:
+            self.fallback += 1
+        else:
+            self.fast_path += 1
+        return details
+
+    @staticmethod
+    def _parse(text):
+        found = {}
+        bare = []
+        for match in _NUMBER.finditer(text):
+            value = float(match.group().replace(",", ""))
+            before = text[:match.start()]
+            after = text[match.end():]
+            unit = _UNIT_AFTER.match(after)
+
+            # A price marker wins over a unit: in "price 500 days 3" the
+            # "days" after 500 labels the next number
+            if _PRICE_BEFORE.search(before) or _PRICE_AFTER.match(after):
+                role = "price"
+            elif unit:
+                role, value = "days", value * UNIT_DAYS[unit.group(1)[0]]
+            elif _DAYS_BEFORE.search(before):
+                role = "days"
+            else:
+                bare.append(value)
+                continue
+
+            if role in found:
+                return None
+            found[role] = value
+
+        missing = [role for role in ("price", "days") if role not in found]
+        if len(bare) != len(missing):
+            return None
+        found.update(zip(missing, bare))
+
+        price, days = found["price"], found["days"]
+        if price <= 0 or days <= 0 or not days.is_integer():
+            return None
+        return {"price": int(price) if price.is_integer() else price,
+                "days": int(days)}
+
+
+detail_parser = DetailParser()
+
+
+class ResponseCache:
+    """Two-tier (memory LRU + SQLite) cache for parsed model responses.
+
+    Entries expire after ttl seconds. Each entry remembers how long the
+    original call took, so hits can be reported as latency saved.
+    """
+
+    def __init__(self, db_file="llm_cache.db", max_entries=256,
+                 max_disk_entries=5000, ttl=7 * 24 * 3600):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Opened on first use, so importing this module creates no file
+        self._db_file = db_file
+        self._conn = None
+
+    @staticmethod
+    def make_key(*parts):
+        return hashlib.sha256(
+            json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def get_or_compute(self, key, compute):
+        """Returns the cached value for key, or calls compute() and stores it.
+
+        Exceptions from compute() propagate and nothing is cached.
+        """
+        entry = self._lookup(key)
+        if entry is not None:
+            return entry[0]
+
+        started = time.perf_counter()
+        value = compute()
+        latency = time.perf_counter() - started
+        self._store(key, value, latency)
+        return value
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "saved_seconds": self.saved_seconds
+        }
+
+    def _db(self):
+        """The SQLite connection (opened on first call), or None without
+        a db_file. Called with the lock held."""
+        if self._conn is None and self._db_file:
+            self._conn = sqlite3.connect(self._db_file, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created REAL NOT NULL, used REAL NOT NULL, latency REAL NOT NULL)")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_responses_used ON responses (used)")
+        return self._conn
+
+    def _lookup(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[1] > self.ttl:
+                del self._memory[key]
+                entry = None
+
+            conn = self._db() if entry is None else None
+            if conn is not None:
+                row = conn.execute(
+                    "SELECT value, created, latency FROM responses WHERE key = ?",
+                    (key,)).fetchone()
+                if row is not None and now - row[1] <= self.ttl:
+                    entry = (json.loads(row[0]), row[1], row[2])
+                    with conn:
+                        conn.execute(
+                            "UPDATE responses SET used = ? WHERE key = ?", (now, key))
+                    self.disk_hits += 1
+                    self._remember(key, entry)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._memory.move_to_end(key)
+            self.hits += 1
+            self.saved_seconds += entry[2]
+            return entry
+
+    def _store(self, key, value, latency):
+        now = time.time()
+        with self._lock:
+            self._remember(key, (value, now, latency))
+            conn = self._db()
+            if conn is None:
+                return
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created, used, latency) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, json.dumps(value), now, now, latency))
+                conn.execute(
+                    "DELETE FROM responses WHERE created < ? OR key IN ("
+                    "SELECT key FROM responses ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                    (now - self.ttl, self.max_disk_entries))
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+
+response_cache = ResponseCache()
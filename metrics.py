@@ -0,0 +1,216 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# ==========================================
+# ⏱️ TIMING SPANS & METRICS
+# ==========================================
+# A process-wide registry of timing spans and counters. The app wraps each
+# section of the script (catalog load, agent init, alerts, every tab) in a
+# span, and the LLM gateway reports each model call with its token counts.
+#
+# Spans are grouped per script run: start_run() opens a run for the
+# calling thread (Streamlit runs each session's script on its own thread),
+# and every span recorded on that thread until end_run() belongs to it.
+# The last few runs and per-span aggregates are shown in the diagnostics
+# panel (?diagnostics=<DIAGNOSTICS_TOKEN>) and can be exported as JSONL or
+# Prometheus text.
+#
+# Disabled (the default unless GROCERY_METRICS=1), span() hands back a
+# shared no-op context manager and observe()/inc() return at once, so the
+# instrumentation costs one attribute check per call site.
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    def __init__(self, registry, name, labels):
+        self._registry = registry
+        self.name = name
+        self.labels = labels
+        self.seconds = None
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self._started
+        self._registry.observe(self.name, self.seconds, **self.labels)
+        return False
+
+
+class _Series:
+    """Count, sum and recent samples of one span name + label set."""
+
+    def __init__(self, window):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=window)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.samples.append(seconds)
+
+    def quantile(self, q):
+        samples = sorted(self.samples)
+        return samples[min(len(samples) - 1, int(len(samples) * q))] if samples else 0.0
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+
+class MetricsRegistry:
+    """Timing spans and counters, aggregated per name and label set."""
+
+    def __init__(self, enabled=False, window=500, runs=20):
+        self.enabled = enabled
+        self.window = window
+        self._series = {}
+        self._counters = {}
+        self._runs = deque(maxlen=runs)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    # --- Recording ---
+
+    def span(self, name, **labels):
+        """Context manager timing its body as `name`."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, labels)
+
+    def observe(self, name, seconds, **labels):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(self.window)
+            series.add(seconds)
+        run = getattr(self._local, "run", None)
+        if run is not None:
+            run["spans"].append({"name": name, "labels": labels,
+                                 "ms": round(seconds * 1000, 3)})
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    # --- Script runs ---
+
+    def start_run(self, **labels):
+        """Opens a run for this thread, closing one left open by a rerun
+        that was cut short (st.rerun() stops the script mid-way)."""
+        if not self.enabled:
+            return
+        self.end_run(complete=False)
+        self._local.run = {"started": time.time(), "labels": labels,
+                           "spans": [], "_t0": time.perf_counter()}
+
+    def end_run(self, complete=True):
+        run = getattr(self._local, "run", None)
+        if run is None:
+            return
+        self._local.run = None
+        run["ms"] = round((time.perf_counter() - run.pop("_t0")) * 1000, 3)
+        run["complete"] = complete
+        self.observe("script_run", run["ms"] / 1000, complete=str(complete).lower())
+        with self._lock:
+            self._runs.append(run)
+
+    def runs(self):
+        """Recorded runs, most recent last."""
+        with self._lock:
+            return list(self._runs)
+
+    # --- Reads & export ---
+
+    def snapshot(self):
+        """One row per span series and per counter."""
+        with self._lock:
+            series = list(self._series.items())
+            counters = list(self._counters.items())
+        rows = [{"type": "span", "name": name, "labels": dict(labels),
+                 "count": s.count, "sum_s": round(s.total, 6),
+                 "mean_ms": round(s.total / s.count * 1000, 3),
+                 "p50_ms": round(s.quantile(0.5) * 1000, 3),
+                 "p95_ms": round(s.quantile(0.95) * 1000, 3),
+                 "max_ms": round(s.max * 1000, 3)}
+                for (name, labels), s in sorted(series)]
+        rows.extend({"type": "counter", "name": name, "labels": dict(labels),
+                     "value": value}
+                    for (name, labels), value in sorted(counters))
+        return rows
+
+    def to_jsonl(self):
+        """The snapshot and the recorded runs, one JSON object per line."""
+        lines = [json.dumps(row) for row in self.snapshot()]
+        lines.extend(json.dumps(dict(run, type="run")) for run in self.runs())
+        return "\n".join(lines) + "\n"
+
+    def to_prometheus(self, prefix="grocery"):
+        """Spans as summaries (seconds), counters as counters."""
+        out = []
+        seen = set()
+        for row in self.snapshot():
+            if row["type"] == "span":
+                metric = f"{prefix}_{_metric_name(row['name'])}_seconds"
+                if metric not in seen:
+                    seen.add(metric)
+                    out.append(f"# TYPE {metric} summary")
+                for q, field in (("0.5", "p50_ms"), ("0.95", "p95_ms")):
+                    out.append(f"{metric}{_labels(row['labels'], quantile=q)} "
+                               f"{row[field] / 1000:.6f}")
+                out.append(f"{metric}_sum{_labels(row['labels'])} {row['sum_s']:.6f}")
+                out.append(f"{metric}_count{_labels(row['labels'])} {row['count']}")
+            else:
+                metric = f"{prefix}_{_metric_name(row['name'])}_total"
+                if metric not in seen:
+                    seen.add(metric)
+                    out.append(f"# TYPE {metric} counter")
+                out.append(f"{metric}{_labels(row['labels'])} {row['value']}")
+        return "\n".join(out) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+            self._counters.clear()
+            self._runs.clear()
+
+
+def _metric_name(name):
+    return "".join(c if c.isalnum() else "_" for c in name)
+
+
+def _labels(labels, **extra):
+    labels = dict(labels, **extra)
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"')
+               for value in labels.values())
+    return "{" + ",".join(f'{_metric_name(key)}="{value}"'
+                          for key, value in zip(labels, escaped)) + "}"
+
+
+registry = MetricsRegistry(
+    enabled=os.environ.get("GROCERY_METRICS", "0") not in ("", "0"))
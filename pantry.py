@@ -0,0 +1,459 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# ==========================================
+# 🗓️ PANTRY STORE & INDEXES
+# ==========================================
+# The pantry is held column-wise: item names are interned to integer codes,
+# buy/expiry dates are day ordinals and statuses are small integer codes.
+# Row views (plain dicts) are only built for the UI.
+#
+# Expiry buckets, keyed on how far an item's expiry date is from "now":
+#   Expired        expiry <  now
+#   Critical       now          <= expiry < now + 3 days
+#   Expiring Soon  now + 3 days <= expiry < now + 6 days
+#   Good           now + 6 days <= expiry
+# which is exactly the days_left < 0 / <= 2 / <= 5 rule the agent used to
+# apply entry by entry. Sorted by expiry date, each bucket is a contiguous
+# slice, so the index only needs the three cut positions between them.
+
+_EPOCH_ORDINAL = datetime(1970, 1, 1).toordinal()
+
+BUCKET_DAYS = np.array([0, 3, 6])
+BUCKET_NAMES = ("Expired", "Critical", "Expiring Soon", "Good")
+STATUS_CODES = {name: code for code, name in enumerate(BUCKET_NAMES)}
+
+
+def expiry_alert(item_name, days_left):
+    if days_left < 0:
+        return f"❌ **{item_name}** has expired!"
+    if days_left <= 2:
+        return f"⚠️ **{item_name}** expires in {days_left} days!"
+    return f"⏳ **{item_name}** expires in {days_left} days."
+
+
+def effective_day(current_date):
+    """Day ordinal that midnight expiry dates are compared against.
+
+    Expiry dates are stored as days, i.e. midnight. Once any part of a day
+    has passed, that day's expiries are in the past, so
+    (expiry_date - current_date).days == expiry_day - effective_day(...).
+    """
+    day = current_date.toordinal()
+    if current_date != datetime(current_date.year, current_date.month,
+                                current_date.day):
+        day += 1
+    return day
+
+
+class PantryStore:
+    """Array-backed pantry with a list-like row view API."""
+
+    def __init__(self, entries=()):
+        self._names = []
+        self._codes = {}
+        self._size = 0
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._items = np.zeros(0, dtype=np.int32)
+        self._buy_days = np.zeros(0, dtype=np.int32)
+        self._expiry_days = np.zeros(0, dtype=np.int32)
+        self._statuses = np.zeros(0, dtype=np.int8)
+        # Bumped on every append/pop so indexes know to rebuild
+        self.version = 0
+
+        self.stock = StockCounter(self)
+        self.expiry = ExpiryIndex(self)
+        self.append(list(entries))
+
+    # --- Row view API ---
+
+    def __len__(self):
+        return self._size
+
+    def __bool__(self):
+        return self._size > 0
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += self._size
+        if not 0 <= position < self._size:
+            raise IndexError("pantry index out of range")
+        return self._row(position)
+
+    def __iter__(self):
+        for position in range(self._size):
+            yield self._row(position)
+
+    def _row(self, position):
+        """A read-only snapshot of one entry, shaped like the old dicts."""
+        return {
+            "id": int(self._ids[position]),
+            "item": self._names[self._items[position]],
+            "buy_date": datetime.fromordinal(int(self._buy_days[position])),
+            "expiry_date": datetime.fromordinal(int(self._expiry_days[position])),
+            "status": BUCKET_NAMES[self._statuses[position]]
+        }
+
+    # --- Columns (views, do not mutate) ---
+
+    @property
+    def ids(self):
+        return self._ids[:self._size]
+
+    @property
+    def item_codes(self):
+        return self._items[:self._size]
+
+    @property
+    def buy_days(self):
+        return self._buy_days[:self._size]
+
+    @property
+    def expiry_days(self):
+        return self._expiry_days[:self._size]
+
+    @property
+    def statuses(self):
+        return self._statuses[:self._size]
+
+    @property
+    def item_names(self):
+        """Interned names, indexed by item code."""
+        return self._names
+
+    def item_code(self, item_name):
+        return self._codes.get(item_name)
+
+    def intern(self, item_name):
+        code = self._codes.get(item_name)
+        if code is None:
+            code = len(self._names)
+            self._names.append(item_name)
+            self._codes[item_name] = code
+            self.stock.grow(len(self._names))
+        return code
+
+    # --- Mutations ---
+
+    def append(self, entries):
+        """Appends entry dicts (with an "id"), in order."""
+        if not entries:
+            return
+        start, end = self._size, self._size + len(entries)
+        self._reserve(end)
+
+        self._ids[start:end] = [entry['id'] for entry in entries]
+        self._items[start:end] = [self.intern(entry['item'])
+                                  for entry in entries]
+        self._buy_days[start:end] = [entry['buy_date'].toordinal()
+                                     for entry in entries]
+        self._expiry_days[start:end] = [entry['expiry_date'].toordinal()
+                                        for entry in entries]
+        self._statuses[start:end] = [STATUS_CODES[entry['status']]
+                                     for entry in entries]
+        self._size = end
+        self.version += 1
+        self.stock.add_rows(self._items[start:end], self._statuses[start:end])
+
+    def pop(self, position):
+        removed = self[position]
+        if position < 0:
+            position += self._size
+        self.stock.remove_rows(self._items[position:position + 1],
+                               self._statuses[position:position + 1])
+
+        for column in (self._ids, self._items, self._buy_days,
+                       self._expiry_days, self._statuses):
+            column[position:self._size - 1] = column[position + 1:self._size]
+        self._size -= 1
+        self.version += 1
+        return removed
+
+    def remove(self, positions):
+        """Removes the entries at positions in one pass; returns their rows."""
+        positions = np.unique(np.asarray(positions, dtype=np.int64))
+        if not len(positions):
+            return []
+        if positions[0] < 0 or positions[-1] >= self._size:
+            raise IndexError("pantry index out of range")
+        removed = [self._row(position) for position in positions]
+        self.stock.remove_rows(self._items[positions], self._statuses[positions])
+
+        keep = np.ones(self._size, dtype=bool)
+        keep[positions] = False
+        size = int(keep.sum())
+        for column in (self._ids, self._items, self._buy_days,
+                       self._expiry_days, self._statuses):
+            column[:size] = column[:self._size][keep]
+        self._size = size
+        self.version += 1
+        return removed
+
+    def _reserve(self, size):
+        capacity = len(self._ids)
+        if size <= capacity:
+            return
+        capacity = max(size, capacity * 2, 64)
+        self._ids = np.resize(self._ids, capacity)
+        self._items = np.resize(self._items, capacity)
+        self._buy_days = np.resize(self._buy_days, capacity)
+        self._expiry_days = np.resize(self._expiry_days, capacity)
+        self._statuses = np.resize(self._statuses, capacity)
+
+    def set_statuses(self, positions, codes):
+        """Writes new status codes; returns {entry_id: status} for changes."""
+        old_codes = self._statuses[positions]
+        changed = old_codes != codes
+        if not changed.any():
+            return {}
+
+        positions = positions[changed]
+        old_codes = old_codes[changed]
+        codes = codes[changed]
+        self._statuses[positions] = codes
+        items = self._items[positions]
+        self.stock.remove_rows(items, old_codes)
+        self.stock.add_rows(items, codes)
+        return {int(entry_id): BUCKET_NAMES[code]
+                for entry_id, code in zip(self._ids[positions], codes)}
+
+    # --- Vectorized queries ---
+
+    def positions_of(self, entry_ids):
+        return np.flatnonzero(np.isin(self.ids, np.asarray(entry_ids)))
+
+    def select(self, statuses=None, sort="expiry", descending=False):
+        """Positions of the entries in the given statuses, sorted by
+        "expiry", "buy" (date) or "item" (name)."""
+        if statuses is None:
+            positions = np.arange(self._size)
+        else:
+            codes = [STATUS_CODES[status] for status in statuses]
+            positions = np.flatnonzero(np.isin(self.statuses, codes))
+
+        if sort == "item":
+            name_rank = np.empty(len(self._names), dtype=np.int64)
+            name_rank[np.argsort(np.array(self._names, dtype=object))] = \
+                np.arange(len(self._names))
+            keys = name_rank[self.item_codes[positions]]
+        elif sort == "buy":
+            keys = self.buy_days[positions]
+        else:
+            keys = self.expiry_days[positions]
+        order = np.argsort(-keys if descending else keys, kind='stable')
+        return positions[order]
+
+    def columns(self, positions):
+        """Column arrays for the given positions, ready for a DataFrame."""
+        names = np.array(self._names, dtype=object)
+        return {
+            "id": self._ids[positions],
+            "item": names[self._items[positions]],
+            "buy_date": (self._buy_days[positions].astype(np.int64)
+                         - _EPOCH_ORDINAL).astype('datetime64[D]'),
+            "expiry_date": (self._expiry_days[positions].astype(np.int64)
+                            - _EPOCH_ORDINAL).astype('datetime64[D]'),
+            "status": np.array(BUCKET_NAMES, dtype=object)[self._statuses[positions]]
+        }
+
+    def item_totals(self):
+        """Entry count per item code."""
+        return np.bincount(self.item_codes, minlength=len(self._names))
+
+    def item_overview(self):
+        """One summary row per item in the pantry, most urgent first.
+
+        Rows are (name, {status: count}, next_expiry, last_bought), where
+        next_expiry is the soonest non-expired expiry date (or None) and
+        statuses are those of the last ExpiryIndex refresh. Items are
+        ordered by their most urgent non-expired bucket; items with only
+        expired entries come last.
+        """
+        n_items = len(self._names)
+        counts = self.stock.table()
+        never = np.iinfo(np.int32).max
+        fresh = self.statuses > 0
+        next_expiry = np.full(n_items, never, dtype=np.int64)
+        np.minimum.at(next_expiry, self.item_codes[fresh], self.expiry_days[fresh])
+        last_bought = np.zeros(n_items, dtype=np.int64)
+        np.maximum.at(last_bought, self.item_codes, self.buy_days)
+
+        # First non-zero bucket after "Expired"; len(BUCKET_NAMES) if none
+        present = counts[:, 1:] > 0
+        urgency = np.where(present.any(axis=1), present.argmax(axis=1),
+                           len(BUCKET_NAMES))
+        # Soonest expiry first among Critical / Expiring Soon items, most
+        # recently bought first among the rest
+        tie_break = np.where(urgency < 2, next_expiry, -last_bought)
+        codes = np.flatnonzero(counts.sum(axis=1) > 0)
+        codes = codes[np.lexsort((tie_break[codes], urgency[codes]))]
+
+        return [(self._names[code],
+                 {BUCKET_NAMES[status]: int(count)
+                  for status, count in enumerate(counts[code]) if count},
+                 datetime.fromordinal(int(next_expiry[code]))
+                 if next_expiry[code] != never else None,
+                 datetime.fromordinal(int(last_bought[code])))
+                for code in codes]
+
+
+class StockCounter:
+    """Number of pantry entries per (item, status), kept up to date by the
+    store's mutations and the expiry pass instead of recounted per click."""
+
+    def __init__(self, store):
+        self._store = store
+        self._counts = np.zeros((0, len(BUCKET_NAMES)), dtype=np.int64)
+
+    def grow(self, n_items):
+        if n_items > len(self._counts):
+            extra = max(n_items, 2 * len(self._counts)) - len(self._counts)
+            self._counts = np.vstack([
+                self._counts,
+                np.zeros((extra, len(BUCKET_NAMES)), dtype=np.int64)])
+
+    def add_rows(self, item_codes, status_codes):
+        np.add.at(self._counts, (item_codes, status_codes), 1)
+
+    def remove_rows(self, item_codes, status_codes):
+        np.add.at(self._counts, (item_codes, status_codes), -1)
+
+    def table(self):
+        """(item code, status code) count matrix for the interned items."""
+        return self._counts[:len(self._store.item_names)]
+
+    def count(self, item_name, status):
+        code = self._store.item_code(item_name)
+        if code is None:
+            return 0
+        return int(self._counts[code, STATUS_CODES[status]])
+
+    def in_stock(self, item_name):
+        code = self._store.item_code(item_name)
+        if code is None:
+            return 0
+        # Every bucket except "Expired" (code 0)
+        return int(self._counts[code, 1:].sum())
+
+    def check_consistency(self):
+        """Compares against a brute-force recount of the store's columns.
+
+        Returns {(item, status): (maintained, actual)} for every key that
+        disagrees, so an empty dict means the counter is consistent.
+        """
+        store = self._store
+        n_items = len(store.item_names)
+        actual = np.zeros((n_items, len(BUCKET_NAMES)), dtype=np.int64)
+        np.add.at(actual, (store.item_codes, store.statuses), 1)
+        maintained = self._counts[:n_items]
+        return {(store.item_names[code], BUCKET_NAMES[status]):
+                (int(maintained[code, status]), int(actual[code, status]))
+                for code, status in zip(*np.nonzero(maintained != actual))}
+
+
+class ExpiryIndex:
+    """Expiry-sorted permutation of the store, with cached statuses and alerts.
+
+    Statuses and alert texts only depend on effective_day(current_date), so
+    refresh() is O(1) while that day and the store stay the same. Moving the
+    day only re-labels the rows between the old and the new cut positions;
+    a checkout or delete re-sorts and re-labels the columns in one pass.
+    """
+
+    def __init__(self, store):
+        self._store = store
+        self._version = None
+        self._day = None
+        self._order = np.zeros(0, dtype=np.int64)
+        self._sorted_days = np.zeros(0, dtype=np.int32)
+        self._cuts = np.zeros(len(BUCKET_DAYS), dtype=np.int64)
+        self._expired_alerts = []
+        self._alerts = []
+        self._changes = {}
+
+    def refresh(self, current_date):
+        """Moves the index to current_date. The status changes are kept
+        for take_changes()."""
+        store = self._store
+        day = effective_day(current_date)
+        if self._version == store.version and self._day == day:
+            return
+
+        old_expired = self._cuts[0]
+        new_cuts = np.searchsorted(self._sorted_days, day + BUCKET_DAYS)
+        if self._version != store.version:
+            self._order = np.argsort(store.expiry_days, kind='stable')
+            self._sorted_days = store.expiry_days[self._order]
+            new_cuts = np.searchsorted(self._sorted_days, day + BUCKET_DAYS)
+            ranks = np.arange(len(self._order))
+            self._expired_alerts = None
+        else:
+            # Ranges can overlap when the day jumps across several buckets
+            ranks = np.unique(np.concatenate([np.zeros(0, dtype=np.int64)] + [
+                np.arange(min(old, new), max(old, new))
+                for old, new in zip(self._cuts, new_cuts)]))
+        self._cuts = new_cuts
+
+        codes = np.searchsorted(self._cuts, ranks, side='right').astype(np.int8)
+        self._changes.update(store.set_statuses(self._order[ranks], codes))
+
+        names = store.item_names
+        expired_end = self._cuts[0]
+        if self._expired_alerts is None:
+            self._expired_alerts = [
+                expiry_alert(names[code], -1)
+                for code in store.item_codes[self._order[:expired_end]]]
+        elif expired_end >= old_expired:
+            self._expired_alerts.extend(
+                expiry_alert(names[code], -1)
+                for code in store.item_codes[self._order[old_expired:expired_end]])
+        else:
+            del self._expired_alerts[expired_end:]
+
+        window = self._order[expired_end:self._cuts[2]]
+        self._alerts = self._expired_alerts + [
+            expiry_alert(names[code], int(days) - day)
+            for code, days in zip(store.item_codes[window],
+                                  store.expiry_days[window])]
+
+        self._version = store.version
+        self._day = day
+
+    def alerts(self):
+        """Alerts for the last refreshed date, soonest expiry first."""
+        return self._alerts
+
+    def take_changes(self):
+        """{entry_id: status} for the entries whose status changed since the
+        last call, across every refresh() in between (the timeline moves the
+        index through many days first)."""
+        changes, self._changes = self._changes, {}
+        return changes
+
+
+class StatusTimeline:
+    """Expiry alerts and restock suggestions for every day of the slider.
+
+    Built once per pantry/catalog version so that scrubbing through the
+    "Fast Forward Time" range is a dictionary lookup. Statuses are not
+    stored per day: re-pointing the ExpiryIndex at a neighbouring day only
+    touches the entries that change bucket.
+    """
+
+    def __init__(self, index, start, days, suggest):
+        self.start = start
+        self._days = {}
+        for offset in range(days + 1):
+            current_date = start + timedelta(days=offset)
+            index.refresh(current_date)
+            self._days[offset] = (current_date, index.alerts(),
+                                  suggest(current_date))
+
+    def date_at(self, offset):
+        return self._days[offset][0]
+
+    def alerts_at(self, offset):
+        """(expiry alerts, restock suggestions) for a slider position."""
+        _, alerts, suggestions = self._days[offset]
+        return alerts, suggestions
@@ -0,0 +1,192 @@
+import heapq
+import math
+
+import numpy as np
+
+# ==========================================
+# 🔁 RESTOCK PREDICTION
+# ==========================================
+# Each item's repurchase interval is learned from the days it was bought:
+# an exponentially weighted mean and variance of the gaps between
+# consecutive purchase days. Until an item has been bought twice, a prior
+# (the category's default interval) stands in for the mean and counts as
+# one observation, so the first few real gaps are averaged in rather
+# than smoothed away.
+#
+# An item is due `mean - EARLY_BY_STD * std` days after its last purchase
+# (at least one day), i.e. a little earlier for items bought irregularly.
+# Due dates sit in a min-heap; an item's old heap entry is left in place
+# and skipped (its stamp no longer matches) when the item is rescheduled.
+
+ALPHA = 0.3
+EARLY_BY_STD = 0.5
+
+# Category -> (default restock interval in days, message). The interval is
+# only a starting point; RestockEngine learns each item's own.
+RESTOCK_RULES = {
+    "Dairy & Chill": (7, "🥛 It's been {days} days since you bought **{item}**. Need more?"),
+    "Bakery & Snacks": (4, "🍞 Your **{item}** might be finished by now. Restock?"),
+    "Rice & Grains": (30, "🍚 It's been a month since you bought **{item}**. Checking stock?"),
+    "Produce": (7, "🥦 Fresh veggies like **{item}** might need replacing."),
+    "Beverages": (14, "🥤 Running low on **{item}**?"),
+    "Pantry Staples": (60, "🧂 Check your **{item}** supply."),
+}
+LEARNED_MESSAGE = ("🔁 You usually buy **{item}** every {interval} days and "
+                   "it's been {days}. Restock?")
+
+
+def category_prior(catalog):
+    """Prior for RestockEngine: the RESTOCK_RULES interval of an item's
+    catalog category, or None."""
+    def prior(item_name):
+        rule = RESTOCK_RULES.get(catalog.get(item_name, {}).get('category'))
+        return rule[0] if rule else None
+    return prior
+
+
+def restock_messages(due, catalog):
+    """Suggestion texts for RestockEngine.due() rows."""
+    messages = []
+    for item, days_since_buy, interval in due:
+        if interval is not None:
+            msg = LEARNED_MESSAGE
+        else:
+            rule = RESTOCK_RULES.get(catalog.get(item, {}).get('category'))
+            if rule is None:
+                # Moved to a category without a rule since it was scheduled
+                continue
+            msg = rule[1]
+        messages.append(msg.format(days=days_since_buy, item=item, interval=interval))
+    return messages
+
+
+class RestockEngine:
+    """Learned repurchase intervals and next due dates for a PantryStore."""
+
+    def __init__(self, store, prior):
+        """prior maps an item name to a default interval in days, or None
+        for items that should only be suggested once an interval is learned."""
+        self._store = store
+        self._prior = prior
+        self._catalog = None
+        self.catalog_version = None
+        self._mean = []        # item code -> interval estimate (days) or None
+        self._var = []
+        self._gaps = []        # item code -> intervals observed
+        self._last_buy = []    # item code -> day ordinal of the last purchase
+        self._stamps = []
+        self._heap = []        # (due day, item code, stamp)
+        self._stale = 0
+        self.added(store.item_codes, store.buy_days)
+
+    def added(self, item_codes, buy_days):
+        """Learns from new purchases, given as parallel code/day arrays."""
+        self._grow()
+        pairs = np.unique(np.stack([np.asarray(item_codes, dtype=np.int64),
+                                    np.asarray(buy_days, dtype=np.int64)]), axis=1)
+        codes, days = pairs.tolist() if pairs.size else ([], [])
+        for code, day in zip(codes, days):
+            self._observe(code, day)
+        for code in dict.fromkeys(codes):
+            self._schedule(code)
+
+    def added_entries(self, entries):
+        self.added([self._store.item_code(entry['item']) for entry in entries],
+                   [entry['buy_date'].toordinal() for entry in entries])
+
+    def sync_catalog(self, catalog, catalog_version):
+        """Re-reads the category_prior() of items that have no learned
+        interval yet, unless this catalog object and version were seen."""
+        if catalog_version == self.catalog_version and catalog is self._catalog:
+            return
+        self._catalog, self.catalog_version = catalog, catalog_version
+        self._prior = prior = category_prior(catalog)
+        self._grow()
+        for code, name in enumerate(self._store.item_names):
+            if not self._gaps[code]:
+                self._mean[code] = prior(name)
+                self._schedule(code)
+
+    # --- Learning ---
+
+    def _grow(self):
+        for name in self._store.item_names[len(self._mean):]:
+            self._mean.append(self._prior(name))
+            self._var.append(0.0)
+            self._gaps.append(0)
+            self._last_buy.append(None)
+            self._stamps.append(0)
+
+    def _observe(self, code, day):
+        last = self._last_buy[code]
+        if last is not None and day <= last:
+            # Same-day or back-dated purchase: no new gap to learn from
+            return
+        self._last_buy[code] = day
+        if last is None:
+            return
+
+        gap = day - last
+        mean = self._mean[code]
+        if mean is None:
+            self._mean[code], self._var[code] = float(gap), 0.0
+        else:
+            # The prior, if any, counts as the first observation
+            seen = self._gaps[code] + 1
+            alpha = max(ALPHA, 1 / (seen + 1))
+            diff = gap - mean
+            self._mean[code] = mean + alpha * diff
+            self._var[code] = (1 - alpha) * (self._var[code] + alpha * diff * diff)
+        self._gaps[code] += 1
+
+    def interval(self, code):
+        """Learned interval in whole days, or None until one gap is seen."""
+        return round(self._mean[code]) if self._gaps[code] else None
+
+    def due_day(self, code):
+        mean, last = self._mean[code], self._last_buy[code]
+        if mean is None or last is None:
+            return None
+        early = EARLY_BY_STD * math.sqrt(self._var[code])
+        return last + max(1, round(mean - early))
+
+    # --- Due dates ---
+
+    def _schedule(self, code):
+        if self._stamps[code]:
+            self._stale += 1
+        self._stamps[code] += 1
+        due = self.due_day(code)
+        if due is not None:
+            heapq.heappush(self._heap, (due, code, self._stamps[code]))
+        if self._stale > 32 and self._stale > len(self._heap) // 2:
+            self._heap = [entry for entry in self._heap
+                          if entry[2] == self._stamps[entry[1]]]
+            heapq.heapify(self._heap)
+            self._stale = 0
+
+    def due(self, current_date):
+        """[(item name, days since last purchase, learned interval or None)]
+        for items still in the pantry whose due date has come, most overdue
+        first.
+
+        Walks the heap from the root and stops descending at entries due
+        after current_date, so the cost follows the number of due items.
+        """
+        day = current_date.toordinal()
+        heap, found = self._heap, []
+        stack = [0] if heap else []
+        while stack:
+            i = stack.pop()
+            due, code, stamp = heap[i]
+            if due > day:
+                continue
+            if stamp == self._stamps[code]:
+                found.append((due, code))
+            stack.extend(child for child in (2 * i + 1, 2 * i + 2)
+                         if child < len(heap))
+
+        stock = self._store.stock.table()
+        return [(self._store.item_names[code], day - self._last_buy[code],
+                 self.interval(code))
+                for _, code in sorted(found) if stock[code].any()]
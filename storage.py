@@ -0,0 +1,465 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+# ==========================================
+# 📂 DATA MANAGER (READ & WRITE)
+# ==========================================
+# DataManager is a thin facade over a storage backend:
+#   - JsonBackend: products.json + a pantry snapshot and append-only journal
+#   - SQLiteBackend: one WAL-mode database with catalog/pantry tables
+# Set GROCERY_STORAGE=sqlite to switch; the database is seeded from the JSON
+# files the first time it is created.
+#
+# Every pantry entry carries a stable "id" so writes touch a single record.
+
+
+def _parse_history_entry(entry, today):
+    if 'buy_date_offset' in entry:
+        buy_date = today + timedelta(days=entry['buy_date_offset'])
+        expiry_date = today + timedelta(days=entry['expiry_offset'])
+    else:
+        try:
+            buy_date = datetime.strptime(entry['buy_date'], "%Y-%m-%d")
+            expiry_date = datetime.strptime(entry['expiry_date'], "%Y-%m-%d")
+        except TypeError:
+            buy_date = entry['buy_date']
+            expiry_date = entry['expiry_date']
+
+    return {
+        "id": entry['id'],
+        "item": entry['item'],
+        "buy_date": buy_date,
+        "expiry_date": expiry_date,
+        "status": entry['status']
+    }
+
+
+class StorageBackend:
+    def __init__(self):
+        # Streamlit sessions run on their own threads and share one backend
+        self._lock = threading.Lock()
+        self._pending_status = {}
+
+    def record_status(self, changes):
+        """Buffers {entry_id: status} changes from the expiry pass.
+
+        Statuses are derived from the simulation date, so they are only
+        written alongside the next add/remove instead of on every rerun.
+        """
+        with self._lock:
+            self._pending_status.update(changes)
+
+    def _take_pending_status(self):
+        """Called with the lock held."""
+        pending, self._pending_status = self._pending_status, {}
+        return pending
+
+
+class JsonBackend(StorageBackend):
+    """Snapshot file plus a journal of add / remove / status records.
+
+    Journal records are replayed idempotently on load: replaying a record
+    that is already reflected in the snapshot is a no-op, so a crash during
+    compaction never corrupts the history.
+    """
+
+    # Fold the journal into a fresh snapshot once it grows past this many bytes
+    COMPACT_THRESHOLD = 256 * 1024
+
+    def __init__(self, catalog_file="products.json",
+                 history_file="pantry_history.json",
+                 journal_file="pantry_history.jsonl"):
+        super().__init__()
+        self.catalog_file = catalog_file
+        self.history_file = history_file
+        self.journal_file = journal_file
+        self._compacting = False
+        self._generation = 0
+        self._next_id = 1
+
+    def load_catalog(self):
+        try:
+            with open(self.catalog_file, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def save_catalog(self, catalog_data):
+        # Replace atomically so a large import is never left half-written
+        tmp_file = self.catalog_file + ".tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(catalog_data, f, indent=4)
+        os.replace(tmp_file, self.catalog_file)
+
+    def catalog_signature(self):
+        """Changes whenever products.json is rewritten, by any process."""
+        try:
+            stat = os.stat(self.catalog_file)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def load_history(self):
+        with self._lock:
+            raw_data = self._read_snapshot()
+            records = self._read_journal()
+        raw_data = self._replay(raw_data, records)
+
+        today = datetime.now()
+        processed_data = [_parse_history_entry(entry, today)
+                          for entry in raw_data]
+
+        if processed_data:
+            last_id = max(entry['id'] for entry in processed_data)
+            with self._lock:
+                self._next_id = max(self._next_id, last_id + 1)
+        return processed_data
+
+    def save_history(self, pantry_data):
+        """Writes a full snapshot and discards the journal."""
+        serializable_data = [self._serialize(entry) for entry in pantry_data]
+
+        with self._lock:
+            self._write_snapshot(serializable_data)
+            self._pending_status.clear()
+            if os.path.exists(self.journal_file):
+                os.remove(self.journal_file)
+            self._generation += 1
+
+    def record_add(self, entries):
+        """Journals new pantry entries, assigning each one a fresh id."""
+        with self._lock:
+            records = []
+            for entry in entries:
+                entry['id'] = self._next_id
+                self._next_id += 1
+                records.append({"op": "add", "entry": self._serialize(entry)})
+            self._append(records)
+
+    def record_remove(self, entries):
+        with self._lock:
+            self._append([{"op": "remove", "id": entry['id']} for entry in entries])
+
+    def _append(self, records):
+        """Called with the lock held."""
+        lines = [json.dumps({"op": "status", "id": entry_id, "status": status})
+                 for entry_id, status in self._take_pending_status().items()]
+        lines.extend(json.dumps(record) for record in records)
+        if not lines:
+            return
+
+        with open(self.journal_file, 'a') as f:
+            f.write("\n".join(lines) + "\n")
+            size = f.tell()
+
+        if size >= self.COMPACT_THRESHOLD and not self._compacting:
+            self._compacting = True
+            threading.Thread(target=self._compact, daemon=True).start()
+
+    @staticmethod
+    def _serialize(entry):
+        return {
+            "id": entry['id'],
+            "item": entry['item'],
+            "buy_date": entry['buy_date'].strftime("%Y-%m-%d"),
+            "expiry_date": entry['expiry_date'].strftime("%Y-%m-%d"),
+            "status": entry['status']
+        }
+
+    def _read_snapshot(self):
+        try:
+            with open(self.history_file, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+
+    def _write_snapshot(self, raw_data):
+        tmp_file = self.history_file + ".tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(raw_data, f, indent=4)
+        os.replace(tmp_file, self.history_file)
+
+    def _read_journal(self, end=None):
+        try:
+            with open(self.journal_file, 'rb') as f:
+                data = f.read() if end is None else f.read(end)
+        except FileNotFoundError:
+            return []
+
+        records = []
+        for line in data.splitlines():
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # Torn line from an interrupted append
+                continue
+        return records
+
+    @staticmethod
+    def _replay(raw_data, records):
+        entries = {}
+        for position, entry in enumerate(raw_data):
+            # Snapshots written before the journal existed have no ids
+            entry.setdefault('id', position + 1)
+            entries[entry['id']] = entry
+
+        for record in records:
+            if record['op'] == "add":
+                entries.setdefault(record['entry']['id'], record['entry'])
+            elif record['op'] == "remove":
+                entries.pop(record['id'], None)
+            elif record['op'] == "status" and record['id'] in entries:
+                entries[record['id']]['status'] = record['status']
+        return list(entries.values())
+
+    def _compact(self):
+        try:
+            with self._lock:
+                generation = self._generation
+                if not os.path.exists(self.journal_file):
+                    return
+                raw_data = self._read_snapshot()
+                end = os.path.getsize(self.journal_file)
+                records = self._read_journal(end)
+
+            raw_data = self._replay(raw_data, records)
+            tmp_file = self.history_file + ".compact"
+            with open(tmp_file, 'w') as f:
+                json.dump(raw_data, f, indent=4)
+
+            with self._lock:
+                if generation != self._generation:
+                    # A full save_history() happened meanwhile; it wins
+                    os.remove(tmp_file)
+                    return
+
+                with open(self.journal_file, 'rb') as f:
+                    f.seek(end)
+                    tail = f.read()
+                os.replace(tmp_file, self.history_file)
+                tail_file = self.journal_file + ".tmp"
+                with open(tail_file, 'wb') as f:
+                    f.write(tail)
+                os.replace(tail_file, self.journal_file)
+        finally:
+            self._compacting = False
+
+
+class SQLiteBackend(StorageBackend):
+    """Catalog and pantry rows in SQLite; a write touches only the changed rows.
+
+    Dates are stored as ISO strings ("YYYY-MM-DD HH:MM:SS") so that range
+    comparisons in SQL match datetime comparisons in Python.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS catalog (
+            name TEXT PRIMARY KEY,
+            category TEXT NOT NULL,
+            price NUMERIC NOT NULL,
+            days_to_expire INTEGER NOT NULL,
+            healthy INTEGER NOT NULL,
+            alt TEXT
+        );
+
+        -- AUTOINCREMENT never hands out the id of a deleted row, so a session
+        -- holding a stale copy of a removed entry cannot delete a new one
+        CREATE TABLE IF NOT EXISTS pantry (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            item TEXT NOT NULL,
+            buy_date TEXT NOT NULL,
+            expiry_date TEXT NOT NULL,
+            status TEXT NOT NULL
+        );
+
+        -- The app filters the pantry in memory (pantry.py), so nothing reads
+        -- the indexes older databases were created with
+        DROP INDEX IF EXISTS idx_catalog_category;
+        DROP INDEX IF EXISTS idx_pantry_item;
+        DROP INDEX IF EXISTS idx_pantry_expiry;
+    """
+
+    # Databases created before the pantry ids were AUTOINCREMENT
+    UPGRADE_PANTRY = """
+        ALTER TABLE pantry RENAME TO pantry_old;
+        CREATE TABLE pantry (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            item TEXT NOT NULL,
+            buy_date TEXT NOT NULL,
+            expiry_date TEXT NOT NULL,
+            status TEXT NOT NULL
+        );
+        INSERT INTO pantry SELECT id, item, buy_date, expiry_date, status FROM pantry_old;
+        DROP TABLE pantry_old;
+    """
+
+    def __init__(self, db_file="grocery.db", seed_from=None):
+        super().__init__()
+        self.db_file = db_file
+
+        is_new = not os.path.exists(db_file)
+        # Streamlit runs every session on its own thread
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        pantry_sql = self._conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'pantry'"
+        ).fetchone()[0]
+        if "AUTOINCREMENT" not in pantry_sql:
+            self._conn.executescript("BEGIN;" + self.UPGRADE_PANTRY + "COMMIT;")
+
+        if is_new and seed_from is not None:
+            self.migrate_from(seed_from)
+
+    @staticmethod
+    def _to_db_date(value):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+
+    def migrate_from(self, source):
+        """Copies the catalog and pantry history out of another backend."""
+        self.save_catalog(source.load_catalog())
+        self.save_history(source.load_history())
+
+    def load_catalog(self):
+        catalog_data = {}
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, category, price, days_to_expire, healthy, alt "
+                "FROM catalog ORDER BY rowid").fetchall()
+        for name, category, price, days, healthy, alt in rows:
+            catalog_data.setdefault(category, {})[name] = {
+                "price": price,
+                "days_to_expire": days,
+                "healthy": bool(healthy),
+                "alt": alt
+            }
+        return catalog_data
+
+    def save_catalog(self, catalog_data):
+        rows = [(name, cat, details['price'], details['days_to_expire'],
+                 int(bool(details['healthy'])), details.get('alt'))
+                for cat, items in catalog_data.items()
+                for name, details in items.items()]
+
+        with self._lock, self._conn:
+            # Upsert keeps each product's rowid, which preserves display order
+            self._conn.executemany(
+                "INSERT INTO catalog (name, category, price, days_to_expire, healthy, alt) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET category = excluded.category, "
+                "price = excluded.price, days_to_expire = excluded.days_to_expire, "
+                "healthy = excluded.healthy, alt = excluded.alt", rows)
+            self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS catalog_keep (name TEXT)")
+            self._conn.execute("DELETE FROM catalog_keep")
+            self._conn.executemany("INSERT INTO catalog_keep VALUES (?)",
+                                   [(row[0],) for row in rows])
+            self._conn.execute(
+                "DELETE FROM catalog WHERE name NOT IN (SELECT name FROM catalog_keep)")
+
+    def catalog_signature(self):
+        """Changes whenever another connection commits to the database."""
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def load_history(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, item, buy_date, expiry_date, status "
+                "FROM pantry ORDER BY id").fetchall()
+        return [{
+            "id": entry_id,
+            "item": item,
+            "buy_date": datetime.fromisoformat(buy_date),
+            "expiry_date": datetime.fromisoformat(expiry_date),
+            "status": status
+        } for entry_id, item, buy_date, expiry_date, status in rows]
+
+    def save_history(self, pantry_data):
+        rows = [(entry['id'], entry['item'],
+                 self._to_db_date(entry['buy_date']),
+                 self._to_db_date(entry['expiry_date']), entry['status'])
+                for entry in pantry_data]
+
+        with self._lock, self._conn:
+            self._pending_status.clear()
+            self._conn.execute("DELETE FROM pantry")
+            self._conn.executemany(
+                "INSERT INTO pantry (id, item, buy_date, expiry_date, status) "
+                "VALUES (?, ?, ?, ?, ?)", rows)
+
+    def record_add(self, entries):
+        """Inserts new pantry entries in one transaction, giving each one the
+        id SQLite assigned to its row."""
+        with self._lock, self._conn:
+            self._flush_status()
+            for entry in entries:
+                entry['id'] = self._conn.execute(
+                    "INSERT INTO pantry (item, buy_date, expiry_date, status) "
+                    "VALUES (?, ?, ?, ?)",
+                    (entry['item'], self._to_db_date(entry['buy_date']),
+                     self._to_db_date(entry['expiry_date']), entry['status'])
+                ).lastrowid
+
+    def record_remove(self, entries):
+        with self._lock, self._conn:
+            self._flush_status()
+            self._conn.executemany("DELETE FROM pantry WHERE id = ?",
+                                   [(entry['id'],) for entry in entries])
+
+    def _flush_status(self):
+        pending = self._take_pending_status()
+        if pending:
+            self._conn.executemany(
+                "UPDATE pantry SET status = ? WHERE id = ?",
+                [(status, entry_id) for entry_id, status in pending.items()])
+
+
+def _default_backend():
+    if os.environ.get("GROCERY_STORAGE", "json").lower() == "sqlite":
+        return SQLiteBackend(os.environ.get("GROCERY_DB", "grocery.db"),
+                             seed_from=JsonBackend())
+    return JsonBackend()
+
+
+class DataManager:
+    backend = _default_backend()
+    # Bumped on every catalog write so derived caches know to rebuild
+    catalog_version = 0
+
+    @staticmethod
+    def use_backend(backend):
+        DataManager.backend = backend
+
+    @staticmethod
+    def load_catalog():
+        return DataManager.backend.load_catalog()
+
+    @staticmethod
+    def save_catalog(catalog_data):
+        DataManager.backend.save_catalog(catalog_data)
+        DataManager.catalog_version += 1
+
+    @staticmethod
+    def load_history():
+        return DataManager.backend.load_history()
+
+    @staticmethod
+    def save_history(pantry_data):
+        DataManager.backend.save_history(pantry_data)
+
+    @staticmethod
+    def record_add(entries):
+        DataManager.backend.record_add(entries)
+
+    @staticmethod
+    def record_remove(entries):
+        DataManager.backend.record_remove(entries)
+
+    @staticmethod
+    def record_status(changes):
+        DataManager.backend.record_status(changes)
+
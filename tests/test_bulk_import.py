@@ -0,0 +1,98 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import bulk_import  # noqa: E402
+from llm import StubModel  # noqa: E402
+from storage import DataManager, JsonBackend  # noqa: E402
+
+CATALOG = {"Produce": {"Banana": {"price": 200, "days_to_expire": 5,
+                                  "healthy": True, "alt": None}},
+           "Bakery & Snacks": {}}
+ROWS = [("Banana", 250, 6), ("Chicken Burger", 900, 2), ("Mango Juice", 300, 30),
+        ("Kottu Roti", 700, 1), ("Red Rice", 400, 180)]
+
+
+class FailingStub(StubModel):
+    """Fails every batch that contains `name`, like an interrupted run."""
+
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+
+    def generate_content(self, prompt, stream=False):
+        if self.name in prompt:
+            with self._lock:
+                self.calls += 1
+            raise ValueError("model unavailable")
+        return super().generate_content(prompt, stream)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    backend = JsonBackend(str(tmp_path / "products.json"),
+                          str(tmp_path / "pantry_history.json"),
+                          str(tmp_path / "pantry_history.jsonl"))
+    backend.save_catalog(CATALOG)
+    previous = DataManager.backend
+    DataManager.use_backend(backend)
+    # No waiting between retries of a failed batch
+    monkeypatch.setattr(bulk_import.time, "sleep", lambda seconds: None)
+    with open(tmp_path / "prices.csv", "w") as f:
+        f.write("name,price,days\n")
+        f.writelines(f"{name},{price},{days}\n" for name, price, days in ROWS)
+    yield tmp_path
+    DataManager.use_backend(previous)
+
+
+def run(workdir, monkeypatch, model):
+    monkeypatch.setattr(bulk_import, "StubModel", lambda: model)
+    return bulk_import.main([str(workdir / "prices.csv"), "--stub",
+                             "--batch-size", "2", "--workers", "2",
+                             "--rpm", "60000"])
+
+
+def load_catalog(workdir):
+    with open(workdir / "products.json") as f:
+        return {name: dict(product, category=category)
+                for category, products in json.load(f).items()
+                for name, product in products.items()}
+
+
+def test_import_in_batches(workdir, monkeypatch):
+    model = StubModel()
+    assert run(workdir, monkeypatch, model) == 0
+    # Banana already exists; the other four go out two per request
+    assert model.calls == 2
+
+    catalog = load_catalog(workdir)
+    assert catalog["Banana"]["price"] == 250
+    assert catalog["Banana"]["days_to_expire"] == 6
+    assert catalog["Chicken Burger"]["healthy"] is False
+    assert catalog["Chicken Burger"]["alt"] == "Healthy Chicken Burger"
+    assert "Healthy Chicken Burger" in catalog
+    assert catalog["Mango Juice"]["price"] == 300
+    assert not os.path.exists(workdir / "prices.csv.progress.jsonl")
+
+
+def test_interrupted_import_resumes(workdir, monkeypatch):
+    original = (workdir / "products.json").read_text()
+    failing = FailingStub("Kottu Roti")
+    assert run(workdir, monkeypatch, failing) == 1
+
+    # Nothing is written to the catalog until every batch succeeded
+    assert (workdir / "products.json").read_text() == original
+    with open(workdir / "prices.csv.progress.jsonl") as f:
+        saved = {json.loads(line)["name"] for line in f}
+    assert saved == {"Chicken Burger", "Mango Juice"}
+
+    model = StubModel()
+    assert run(workdir, monkeypatch, model) == 0
+    assert model.calls == 1  # only the failed batch is sent again
+    catalog = load_catalog(workdir)
+    assert {"Chicken Burger", "Mango Juice", "Kottu Roti", "Red Rice"} <= set(catalog)
+    assert not os.path.exists(workdir / "prices.csv.progress.jsonl")
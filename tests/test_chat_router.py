@@ -0,0 +1,59 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from chat import Intent, IntentRouter  # noqa: E402
+
+CATALOG = ["Instant Noodles (Chicken)", "Fish Bun (Maalu Paan)",
+           "Red Rice Noodles", "Highland Milk Packet", "Fresh Milk",
+           "Red Dhal (Parippu)", "Samba Rice"]
+PANTRY = ["Red Rice Noodles", "Highland Milk Packet", "Fresh Milk",
+          "Red Dhal (Parippu)", "Fish Bun (Maalu Paan)",
+          "Instant Noodles (Chicken)", "Chicken Burger"]
+
+CASES = [
+    # add: known only for an exact catalog name, never another product
+    ("Add chicken", Intent("add", "Chicken")),
+    ("Add fish", Intent("add", "Fish")),
+    ("add pizza to the database", Intent("add", "Pizza")),
+    ("Please add samba rice", Intent("add", "Samba Rice", True)),
+    ("Save Samba Rice", Intent("add", "Samba Rice", True)),
+    ("Create a meal plan", None),
+    ("Save money", None),
+    ("add milk to my shopping list", None),
+    ("add some bread please", None),
+    # remove: unique exact or alias pantry match only
+    ("Remove red rice", None),
+    ("Remove red rice noodles", Intent("remove", "Red Rice Noodles", True)),
+    ("I finished the parippu", Intent("remove", "Red Dhal (Parippu)", True)),
+    ("remove milk from my pantry", None),
+    ("Remove chicken", None),
+    ("Delete pizza", None),
+    # stock: every pantry item containing the name
+    ("Do I have milk?", Intent("stock", "Milk", True,
+                               ("Highland Milk Packet", "Fresh Milk"))),
+    ("Do I have any fresh milk left?", Intent("stock", "Fresh Milk", True,
+                                              ("Fresh Milk",))),
+    ("How many fish buns do I have?", None),
+    ("Do I have enough for dinner?", None),
+    # expiring: short questions only
+    ("What's expiring?", Intent("expiring")),
+    ("Anything going bad soon?", Intent("expiring")),
+    ("What should I cook with the items expiring soon?", None),
+    ("Show me recipes for expiring food", None),
+]
+
+
+@pytest.mark.parametrize("text, expected", CASES)
+def test_route(text, expected):
+    assert IntentRouter().route(text, CATALOG, PANTRY) == expected
+
+
+def test_counts_paths():
+    router = IntentRouter()
+    router.route("What's expiring?", CATALOG, PANTRY)
+    router.route("Tell me a joke", CATALOG, PANTRY)
+    assert (router.local, router.escalated) == (1, 1)
@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from llm import DetailParser  # noqa: E402
+
+CASES = [
+    ("500 3", {"price": 500, "days": 3}),
+    ("1500 LKR, 2 days", {"price": 1500, "days": 2}),
+    ("Rs. 1,200 for 2 weeks", {"price": 1200, "days": 14}),
+    ("Rs.500 - 3 days", {"price": 500, "days": 3}),
+    ("500/- 1 month", {"price": 500, "days": 30}),
+    ("3 days 500", {"price": 500, "days": 3}),
+    ("price 500 days 3", {"price": 500, "days": 3}),
+    ("days 3 price 500", {"price": 500, "days": 3}),
+    ("shelf life: 10, price: 250", {"price": 250, "days": 10}),
+    ("lasts 2 weeks, costs 800", {"price": 800, "days": 14}),
+    # Ambiguous or incomplete: left to the model
+    ("500", None),
+    ("500 3 7", None),
+    ("Rs 500 Rs 600", None),
+    ("about 1.5 days", None),
+]
+
+
+@pytest.mark.parametrize("text, expected", CASES)
+def test_parse(text, expected):
+    assert DetailParser().parse(text) == expected
+
+
+def test_counts_paths():
+    parser = DetailParser()
+    parser.parse("500 3")
+    parser.parse("500")
+    assert (parser.fast_path, parser.fallback) == (1, 1)
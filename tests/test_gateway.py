@@ -0,0 +1,126 @@
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from llm import (BACKGROUND, INTERACTIVE, GatewayBusy, LLMGateway,  # noqa: E402
+                 RateLimited, StubModel)
+
+
+class GatedModel:
+    """Records prompts in call order; the first call waits for release()."""
+
+    def __init__(self):
+        self.prompts = []
+        self.started = threading.Event()
+        self._release = threading.Event()
+
+    def generate_content(self, prompt, stream=False):
+        if not self.started.is_set():
+            self.started.set()
+            self._release.wait(5)
+        self.prompts.append(prompt)
+        return SimpleNamespace(text=prompt)
+
+    def release(self):
+        self._release.set()
+
+
+def call_in_thread(gateway, prompt, results, **kwargs):
+    def run():
+        try:
+            results[prompt] = gateway.generate_content(prompt, **kwargs).text
+        except Exception as e:
+            results[prompt] = e
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def wait_until_queued(gateway, n):
+    for _ in range(500):
+        if gateway._queue.qsize() == n:
+            return
+        time.sleep(0.01)
+    raise AssertionError(f"queue never reached {n} jobs")
+
+
+def test_identical_prompts_share_one_call():
+    model = StubModel(delay=0.2)
+    gateway = LLMGateway(model, workers=4)
+    results = {}
+    threads = [threading.Thread(target=lambda i=i: results.__setitem__(
+        i, gateway.generate_content("Hello"))) for i in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert model.calls == 1
+    assert gateway.metrics.coalesced == 4
+    assert len({id(response) for response in results.values()}) == 1
+
+
+def test_rate_limits_are_retried_with_backoff():
+    model = StubModel(rate_limit_every=2)
+    gateway = LLMGateway(model, workers=1, base_delay=0.01, max_delay=0.05)
+    for i in range(4):
+        assert gateway.generate_content(f"prompt {i}").text
+
+    stats = gateway.metrics.snapshot()
+    assert stats["calls"] == 4
+    assert stats["rate_limited"] == stats["retries"] == model.calls - 4 > 0
+    assert stats["errors"] == 0
+
+
+def test_rate_limit_gives_up_after_max_retries():
+    model = StubModel(rate_limit_every=1)
+    gateway = LLMGateway(model, workers=1, max_retries=2, base_delay=0.01)
+    with pytest.raises(RateLimited):
+        gateway.generate_content("prompt")
+    assert model.calls == 3
+    assert gateway.metrics.errors == 1
+
+
+def test_interactive_calls_go_before_background_ones():
+    model = GatedModel()
+    gateway = LLMGateway(model, workers=1)
+    results = {}
+    threads = [call_in_thread(gateway, "first", results, priority=BACKGROUND)]
+    model.started.wait(5)
+    for i in range(3):
+        threads.append(call_in_thread(gateway, f"background {i}", results,
+                                      priority=BACKGROUND))
+        wait_until_queued(gateway, i + 1)
+    threads.append(call_in_thread(gateway, "chat", results, priority=INTERACTIVE))
+    wait_until_queued(gateway, 4)
+    model.release()
+    for thread in threads:
+        thread.join(5)
+
+    assert model.prompts == ["first", "chat", "background 0", "background 1",
+                             "background 2"]
+
+
+def test_full_queue_raises_gateway_busy():
+    model = GatedModel()
+    gateway = LLMGateway(model, workers=1, max_queue=1)
+    results = {}
+    threads = [call_in_thread(gateway, "running", results)]
+    model.started.wait(5)
+    threads.append(call_in_thread(gateway, "queued", results))
+    wait_until_queued(gateway, 1)
+
+    with pytest.raises(GatewayBusy):
+        gateway.generate_content("rejected")
+    assert gateway.metrics.rejected == 1
+
+    model.release()
+    for thread in threads:
+        thread.join(5)
+    assert results == {"running": "running", "queued": "queued"}
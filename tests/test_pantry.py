@@ -0,0 +1,83 @@
+import os
+import random
+import sys
+from collections import Counter
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from pantry import PantryStore, expiry_alert  # noqa: E402
+
+START = datetime(2026, 1, 1)
+ITEMS = ["Milk", "Bread", "Rice", "Eggs", "Dhal", "Tea"]
+
+
+def days_left_status(days_left):
+    """The original per-entry rule."""
+    if days_left < 0:
+        return "Expired"
+    if days_left <= 2:
+        return "Critical"
+    if days_left <= 5:
+        return "Expiring Soon"
+    return "Good"
+
+
+def random_entries(rng, next_id, n):
+    entries = []
+    for entry_id in range(next_id, next_id + n):
+        buy = START + timedelta(days=rng.randint(-30, 30))
+        entries.append({"id": entry_id, "item": rng.choice(ITEMS), "buy_date": buy,
+                         "expiry_date": buy + timedelta(days=rng.randint(0, 20)),
+                         "status": rng.choice(["Good", "Expired"])})
+    return entries
+
+
+def check(store, current_date):
+    store.expiry.refresh(current_date)
+    expected = [days_left_status((row['expiry_date'] - current_date).days)
+                for row in store]
+    assert [row['status'] for row in store] == expected
+    assert store.stock.check_consistency() == {}
+
+    alerts = Counter()
+    for row in store:
+        days_left = (row['expiry_date'] - current_date).days
+        if days_left <= 5:
+            alerts[expiry_alert(row['item'], max(days_left, -1))] += 1
+    assert Counter(store.expiry.alerts()) == alerts
+
+
+def test_statuses_and_counts_follow_the_days_left_rule():
+    rng = random.Random(0)
+    store = PantryStore(random_entries(rng, 1, 50))
+    next_id = 51
+    current_date = START
+    for _ in range(300):
+        action = rng.random()
+        if action < 0.4:
+            # Move the date back and forth, sometimes several buckets at
+            # once and sometimes to a time of day
+            current_date += timedelta(days=rng.randint(-8, 8),
+                                      hours=rng.choice([0, 0, 9]))
+        elif action < 0.6:
+            n = rng.randint(1, 5)
+            store.append(random_entries(rng, next_id, n))
+            next_id += n
+        elif action < 0.8 and store:
+            store.pop(rng.randrange(len(store)))
+        elif store:
+            store.remove(rng.sample(range(len(store)), min(len(store), rng.randint(1, 4))))
+        check(store, current_date)
+
+
+def test_take_changes_ends_at_the_current_status():
+    rng = random.Random(1)
+    store = PantryStore(random_entries(rng, 1, 40))
+    stored = {row['id']: row['status'] for row in store}
+    for offset in range(15):
+        store.expiry.refresh(START + timedelta(days=offset))
+    store.expiry.refresh(START)
+    stored.update(store.expiry.take_changes())
+    assert stored == {row['id']: row['status'] for row in store}
+    assert store.expiry.take_changes() == {}
@@ -0,0 +1,190 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from storage import JsonBackend, SQLiteBackend  # noqa: E402
+
+DAY = datetime(2026, 1, 1)
+
+
+def backend(tmp_path, threshold=None):
+    json_backend = JsonBackend(str(tmp_path / "products.json"),
+                               str(tmp_path / "pantry_history.json"),
+                               str(tmp_path / "pantry_history.jsonl"))
+    if threshold is not None:
+        json_backend.COMPACT_THRESHOLD = threshold
+    return json_backend
+
+
+def entry(item, days=0, keep=7, status="Good"):
+    return {"item": item, "buy_date": DAY + timedelta(days=days),
+            "expiry_date": DAY + timedelta(days=days + keep), "status": status}
+
+
+def rows(entries):
+    return sorted((e['id'], e['item'], e['buy_date'], e['expiry_date'], e['status'])
+                  for e in entries)
+
+
+def wait_for_compaction(json_backend):
+    deadline = time.time() + 5
+    while json_backend._compacting and time.time() < deadline:
+        time.sleep(0.01)
+    assert not json_backend._compacting
+
+
+def test_round_trip_after_add_remove_status(tmp_path):
+    store = backend(tmp_path)
+    store.save_history([])
+    added = [entry("Milk"), entry("Bread", 1), entry("Rice", 2, 90)]
+    store.record_add(added)
+    assert [e['id'] for e in added] == [1, 2, 3]
+    store.record_remove([added[1]])
+    store.record_status({1: "Expired", 3: "Critical"})
+    store.record_add([entry("Eggs", 3)])  # the buffered statuses are written here
+
+    expected = [dict(added[0], status="Expired"), dict(added[2], status="Critical"),
+                dict(entry("Eggs", 3), id=4)]
+    assert rows(backend(tmp_path).load_history()) == rows(expected)
+
+
+def test_replay_is_idempotent(tmp_path):
+    store = backend(tmp_path)
+    store.save_history([])
+    store.record_add([entry("Milk"), entry("Bread")])
+    store.record_remove([{"id": 2}])
+    loaded = store.load_history()
+
+    # Replaying the journal over a snapshot that already reflects it
+    with open(store.journal_file) as f:
+        journal = f.read()
+    store.save_history(loaded)
+    with open(store.journal_file, "w") as f:
+        f.write(journal)
+    assert rows(backend(tmp_path).load_history()) == rows(loaded)
+
+
+def test_torn_line_is_skipped(tmp_path):
+    store = backend(tmp_path)
+    store.save_history([])
+    store.record_add([entry("Milk")])
+    with open(store.journal_file, "a") as f:
+        f.write('{"op": "add", "entry": {"id": 2, "item": "Br')
+    assert [e['item'] for e in backend(tmp_path).load_history()] == ["Milk"]
+
+
+def test_legacy_snapshot_without_ids(tmp_path):
+    store = backend(tmp_path)
+    with open(store.history_file, "w") as f:
+        json.dump([{"item": "Milk", "buy_date": "2026-01-01",
+                    "expiry_date": "2026-01-08", "status": "Good"},
+                   {"item": "Bread", "buy_date": "2026-01-02",
+                    "expiry_date": "2026-01-05", "status": "Good"}], f)
+    loaded = store.load_history()
+    assert [(e['id'], e['item']) for e in loaded] == [(1, "Milk"), (2, "Bread")]
+
+    new = [entry("Rice")]
+    store.record_add(new)
+    assert new[0]['id'] == 3
+    store.record_remove([loaded[0]])
+    assert [e['item'] for e in backend(tmp_path).load_history()] == ["Bread", "Rice"]
+
+
+def test_compaction_round_trip(tmp_path):
+    store = backend(tmp_path, threshold=512)
+    store.save_history([])
+    kept = []
+    for i in range(40):
+        batch = [entry(f"Item {i}", i), entry(f"Other {i}", i)]
+        store.record_add(batch)
+        store.record_remove([batch[1]])
+        kept.append(batch[0])
+        wait_for_compaction(store)
+
+    assert os.path.getsize(store.journal_file) < 512
+    with open(store.history_file) as f:
+        assert len(json.load(f)) > 0
+    assert rows(backend(tmp_path).load_history()) == rows(kept)
+
+
+def test_crash_between_compaction_replaces(tmp_path):
+    store = backend(tmp_path)
+    store.save_history([])
+    added = [entry("Milk"), entry("Bread"), entry("Rice")]
+    store.record_add(added)
+    store.record_remove([added[0]])
+    store.record_status({2: "Expired"})
+    store.record_add([entry("Eggs")])
+    expected = rows(backend(tmp_path).load_history())
+
+    # The snapshot was replaced but the journal was not yet truncated
+    replayed = JsonBackend._replay(store._read_snapshot(), store._read_journal())
+    store._write_snapshot(replayed)
+    assert rows(backend(tmp_path).load_history()) == expected
+
+
+def test_concurrent_adds_get_unique_ids(tmp_path):
+    store = backend(tmp_path)
+    store.save_history([])
+    batches = [[entry(f"Item {t}-{i}") for i in range(50)] for t in range(8)]
+    threads = [threading.Thread(target=store.record_add, args=(batch,))
+               for batch in batches]
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # switch threads often enough to race
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    loaded = backend(tmp_path).load_history()
+    assert len(loaded) == 400
+    assert len({e['id'] for e in loaded}) == 400
+
+
+def test_sqlite_never_reuses_a_deleted_id(tmp_path):
+    store = SQLiteBackend(str(tmp_path / "grocery.db"))
+    added = [entry("Milk"), entry("Bread")]
+    store.record_add(added)
+    assert [e['id'] for e in added] == [1, 2]
+    store.record_remove([added[1]])
+
+    new = [entry("Rice")]
+    SQLiteBackend(str(tmp_path / "grocery.db")).record_add(new)
+    assert new[0]['id'] == 3
+    # A stale copy of the removed entry no longer matches any row
+    store.record_remove([added[1]])
+    assert rows(store.load_history()) == rows([added[0], new[0]])
+
+
+def test_sqlite_upgrades_an_old_pantry_table(tmp_path):
+    db_file = str(tmp_path / "grocery.db")
+    conn = sqlite3.connect(db_file)
+    conn.executescript("""
+        CREATE TABLE pantry (id INTEGER PRIMARY KEY, item TEXT NOT NULL,
+            buy_date TEXT NOT NULL, expiry_date TEXT NOT NULL, status TEXT NOT NULL);
+        CREATE INDEX idx_pantry_expiry ON pantry (expiry_date);
+        INSERT INTO pantry VALUES (1, 'Milk', '2026-01-01 00:00:00',
+                                   '2026-01-08 00:00:00', 'Good');
+        INSERT INTO pantry VALUES (2, 'Bread', '2026-01-01 00:00:00',
+                                   '2026-01-04 00:00:00', 'Good');
+    """)
+    conn.close()
+
+    store = SQLiteBackend(db_file)
+    assert [(e['id'], e['item']) for e in store.load_history()] == [(1, "Milk"), (2, "Bread")]
+    store.record_remove([{"id": 2}])
+    new = [entry("Rice")]
+    store.record_add(new)
+    assert new[0]['id'] == 3
+    indexes = store._conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'").fetchall()
+    assert indexes == []